@@ -2,195 +2,119 @@
 Przykłady wykorzystania grafu sieci drogowej.
 """
 
-from graph import RoadNetwork, TrafficLight, TrafficLightState, TrafficLightController, TrafficLightPhase
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
+from graph import RoadNetwork, TrafficLightController, TrafficLightPhase
 
-def create_example_network() -> RoadNetwork:
-    """Tworzy przykładową sieć drogową."""
+
+# Skrzyżowania: (klucz, nazwa, x, y)
+NODES: List[Tuple[str, str, float, float]] = [
+    ("A", "Grunwaldzka N", 420, -200),
+    ("B", "Wojska Polskiego W", 220, 0),
+    ("C", "Grunwaldzka x Wojska Polskiego", 660, 65),
+    ("D", "Grunwaldzka x Szymanowskiego", 740, 165),
+    ("E", "Grunwaldzka x Żołnierzy Wyklętych", 940, 400),
+    ("F", "Grunwaldzka x Partyzantów x Jaśkowa Dolina", 1470, 820),
+    ("G", "Wiadukt kolejowy", 1250, 50),
+    ("H", "Żołnierzy Wyklętych x Chrzanowskiego x Partyzantów", 480, 620),
+    ("I", "Żołnierzy Wyklętych S", 0, 800),
+    ("J", "Chrzanowskiego x Szymanowskiego", 325, 435),
+    ("K", "Chrzanowskiego N", 0, 25),
+    ("L", "Jaśkowa Dolina S", 1000, 1200),
+    ("M", "Grunwaldzka x Do Studzienki", 1770, 1050),
+    ("N", "Do Studzienki S", 1370, 1450),
+    ("O", "Grunwaldzka S", 2070, 1250),
+    ("P", "Lewoniewskich", 860, -65),
+]
+
+# Drogi: (od, do, speed_limit, lanes)
+EDGES: List[Tuple[str, str, float, int]] = [
+    ("A", "C", 50, 2),
+    ("C", "D", 50, 2),
+    ("D", "E", 50, 2),
+    ("E", "F", 50, 2),
+    ("G", "E", 50, 2),
+    ("H", "I", 50, 2),
+    ("H", "J", 50, 2),
+    ("J", "K", 50, 2),
+    ("H", "F", 50, 2),
+    ("B", "C", 50, 2),
+    ("D", "J", 50, 2),
+    ("E", "H", 50, 2),
+    ("F", "L", 50, 2),
+    ("F", "M", 50, 2),
+    ("M", "N", 50, 2),
+    ("M", "O", 50, 2),
+    ("P", "C", 50, 2),
+]
+
+# Punkty pośrednie (nie mogą być celem podróży)
+NON_DESTINATIONS: Tuple[str, ...] = ("C", "D", "E", "F", "H", "J", "M")
+
+# Sygnalizacja świetlna: klucz -> lista faz (kierunki, czas trwania)
+# Alternatywna konfiguracja:
+#     "C": [(("A", "E"), 5.0), (("J",), 5.0)],
+#     "J": [(("C", "D"), 5.0), (("K",), 5.0)],
+#     "H": [(("G", "F"), 5.0), (("K", "I"), 5.0)],
+#     "G": [(("D", "H"), 5.0), (("L",), 5.0)],
+#     "D": [(("G", "B"), 5.0), (("J",), 5.0)],
+LIGHTS: Dict[str, List[Tuple[Sequence[str], float]]] = {
+    "C": [(("A", "D"), 5.0), (("P", "C"), 5.0)],
+    "D": [(("C", "E"), 5.0), (("J",), 5.0)],
+    "E": [(("D", "F"), 5.0), (("G", "H"), 5.0)],
+    "F": [(("E", "M"), 5.0), (("H", "L"), 5.0)],
+    "M": [(("F", "O"), 5.0), (("N",), 5.0)],
+    "H": [(("J", "F"), 5.0), (("E", "I"), 5.0)],
+    "J": [(("K", "H"), 5.0), (("D",), 5.0)],
+}
+
+
+def build_network(nodes: Iterable[Tuple[str, str, float, float]],
+                  edges: Iterable[Tuple[str, str, float, int]],
+                  two_way: bool = False,
+                  lights: Optional[Dict[str, List[Tuple[Sequence[str], float]]]] = None,
+                  non_destinations: Iterable[str] = ()) -> RoadNetwork:
+    """
+    Buduje sieć drogową na podstawie tabel z danymi.
+    
+    Args:
+        nodes: Skrzyżowania jako krotki (klucz, nazwa, x, y)
+        edges: Drogi jako krotki (klucz_od, klucz_do, speed_limit, lanes)
+        two_way: Czy drogi są dwukierunkowe
+        lights: Fazy sygnalizacji dla skrzyżowań (klucz -> [(klucze kierunków, czas)])
+        non_destinations: Klucze skrzyżowań, które nie mogą być celem podróży
+    
+    Returns:
+        Zbudowana sieć drogowa
+    """
     network = RoadNetwork()
     
     # Skrzyżowania
-    A = network.add_intersection("Grunwaldzka N", 420, -200)
-    B = network.add_intersection("Wojska Polskiego W", 220, 0)
-    C = network.add_intersection("Grunwaldzka x Wojska Polskiego", 660, 65)
-    D = network.add_intersection("Grunwaldzka x Szymanowskiego", 740, 165)
-    E = network.add_intersection("Grunwaldzka x Żołnierzy Wyklętych", 940, 400)
-    F = network.add_intersection("Grunwaldzka x Partyzantów x Jaśkowa Dolina", 1470, 820)
-    G = network.add_intersection("Wiadukt kolejowy", 1250, 50)
-    H = network.add_intersection("Żołnierzy Wyklętych x Chrzanowskiego x Partyzantów", 480, 620)
-    I = network.add_intersection("Żołnierzy Wyklętych S", 0, 800)
-    J = network.add_intersection("Chrzanowskiego x Szymanowskiego", 325, 435)
-    K = network.add_intersection("Chrzanowskiego N", 0, 25)
-    L = network.add_intersection("Jaśkowa Dolina S", 1000, 1200)
-    M = network.add_intersection("Grunwaldzka x Do Studzienki", 1770, 1050)
-    N = network.add_intersection("Do Studzienki S", 1370, 1450)
-    O = network.add_intersection("Grunwaldzka S", 2070, 1250)
-    P = network.add_intersection("Lewoniewskich", 860, -65)
+    nodes = list(nodes)
+    created = network.add_intersections_bulk([(name, x, y) for _, name, x, y in nodes])
+    by_key = {key: intersection.id for (key, _, _, _), intersection in zip(nodes, created)}
     
-    # Punkty pośrednie
-    C.is_destination = False
-    D.is_destination = False
-    E.is_destination = False
-    F.is_destination = False
-    H.is_destination = False
-    J.is_destination = False
-    M.is_destination = False
+    for key in non_destinations:
+        network.get_intersection(by_key[key]).is_destination = False
     
-    # Sygnalizację świetlna
-    # Faza 1: Pojazdy z B mogą jechać przez 5 sekund
-    # Faza 2: Pojazdy z A (przez diagonal) mogą jechać przez 5 sekund
-    # C.traffic_light_controller = TrafficLightController([
-    #     TrafficLightPhase(allowed_directions={A.id, E.id}, duration=5.0),
-    #     TrafficLightPhase(allowed_directions={J.id}, duration=5.0)
-    # ])
-    # J.traffic_light_controller = TrafficLightController([
-    #     TrafficLightPhase(allowed_directions={C.id, D.id}, duration=5.0),
-    #     TrafficLightPhase(allowed_directions={K.id}, duration=5.0)
-    # ])
-    # H.traffic_light_controller = TrafficLightController([
-    #     TrafficLightPhase(allowed_directions={G.id, F.id}, duration=5.0),
-    #     TrafficLightPhase(allowed_directions={K.id, I.id}, duration=5.0)
-    # ])
-    # G.traffic_light_controller = TrafficLightController([
-    #     TrafficLightPhase(allowed_directions={D.id, H.id}, duration=5.0),
-    #     TrafficLightPhase(allowed_directions={L.id}, duration=5.0)
-    # ])
-    # D.traffic_light_controller = TrafficLightController([
-    #     TrafficLightPhase(allowed_directions={G.id, B.id}, duration=5.0),
-    #     TrafficLightPhase(allowed_directions={J.id}, duration=5.0)
-    # ])
-    
-    C.traffic_light_controller = TrafficLightController([
-        TrafficLightPhase(allowed_directions={A.id, D.id}, duration=5.0),
-        TrafficLightPhase(allowed_directions={P.id, C.id}, duration=5.0)
-    ])
-    D.traffic_light_controller = TrafficLightController([
-        TrafficLightPhase(allowed_directions={C.id, E.id}, duration=5.0),
-        TrafficLightPhase(allowed_directions={J.id}, duration=5.0)
-    ])
-    E.traffic_light_controller = TrafficLightController([
-        TrafficLightPhase(allowed_directions={D.id, F.id}, duration=5.0),
-        TrafficLightPhase(allowed_directions={G.id, H.id}, duration=5.0)
-    ])
-    F.traffic_light_controller = TrafficLightController([
-        TrafficLightPhase(allowed_directions={E.id, M.id}, duration=5.0),
-        TrafficLightPhase(allowed_directions={H.id, L.id}, duration=5.0)
-    ])
-    M.traffic_light_controller = TrafficLightController([
-        TrafficLightPhase(allowed_directions={F.id, O.id}, duration=5.0),
-        TrafficLightPhase(allowed_directions={N.id}, duration=5.0)
-    ])
-    H.traffic_light_controller = TrafficLightController([
-        TrafficLightPhase(allowed_directions={J.id, F.id}, duration=5.0),
-        TrafficLightPhase(allowed_directions={E.id, I.id}, duration=5.0)
-    ])
-    J.traffic_light_controller = TrafficLightController([
-        TrafficLightPhase(allowed_directions={K.id, H.id}, duration=5.0),
-        TrafficLightPhase(allowed_directions={D.id}, duration=5.0)
-    ])
+    # Sygnalizacja świetlna
+    for key, phases in (lights or {}).items():
+        network.get_intersection(by_key[key]).traffic_light_controller = TrafficLightController([
+            TrafficLightPhase(allowed_directions={by_key[d] for d in directions}, duration=duration)
+            for directions, duration in phases
+        ])
     
     # Drogi
-    network.add_two_way_road(
-        from_id=A.id,
-        to_id=C.id,
-        speed_limit=50,
-        lanes=2
-    )
-    network.add_two_way_road(
-        from_id=C.id,
-        to_id=D.id,
-        speed_limit=50,
-        lanes=2
-    )
-    network.add_two_way_road(
-        from_id=D.id,
-        to_id=E.id,
-        speed_limit=50,
-        lanes=2
-    )
-    network.add_two_way_road(
-        from_id=E.id,
-        to_id=F.id,
-        speed_limit=50,
-        lanes=2
-    )
-    network.add_two_way_road(
-        from_id=G.id,
-        to_id=E.id,
-        speed_limit=50,
-        lanes=2
-    )
-    network.add_two_way_road(
-        from_id=H.id,
-        to_id=I.id,
-        speed_limit=50,
-        lanes=2
-    )
-    network.add_two_way_road(
-        from_id=H.id,
-        to_id=J.id,
-        speed_limit=50,
-        lanes=2
-    )
-    network.add_two_way_road(
-        from_id=J.id,
-        to_id=K.id,
-        speed_limit=50,
-        lanes=2
-    )
-    network.add_two_way_road(
-        from_id=H.id,
-        to_id=F.id,
-        speed_limit=50,
-        lanes=2
-    )
-    network.add_two_way_road(
-        from_id=B.id,
-        to_id=C.id,
-        speed_limit=50,
-        lanes=2
-    )
-    network.add_two_way_road(
-        from_id=D.id,
-        to_id=J.id,
-        speed_limit=50,
-        lanes=2
-    )
-    network.add_two_way_road(
-        from_id=E.id,
-        to_id=H.id,
-        speed_limit=50,
-        lanes=2
-    )
-    network.add_two_way_road(
-        from_id=F.id,
-        to_id=L.id,
-        speed_limit=50,
-        lanes=2
-    )
-    network.add_two_way_road(
-        from_id=F.id,
-        to_id=M.id,
-        speed_limit=50,
-        lanes=2
-    )
-    network.add_two_way_road(
-        from_id=M.id,
-        to_id=N.id,
-        speed_limit=50,
-        lanes=2
-    )
-    network.add_two_way_road(
-        from_id=M.id,
-        to_id=O.id,
-        speed_limit=50,
-        lanes=2
-    )
-    network.add_two_way_road(
-        from_id=P.id,
-        to_id=C.id,
-        speed_limit=50,
-        lanes=2
-    )
+    rows = [(by_key[a], by_key[b], speed_limit, lanes) for a, b, speed_limit, lanes in edges]
+    if two_way:
+        network.add_two_way_roads_bulk(rows)
+    else:
+        network.add_roads_bulk(rows)
+    
     return network
 
+
+def create_example_network() -> RoadNetwork:
+    """Tworzy przykładową sieć drogową."""
+    return build_network(NODES, EDGES, two_way=True, lights=LIGHTS,
+                         non_destinations=NON_DESTINATIONS)
@@ -2,26 +2,50 @@
 Moduł do zarządzania flotą pojazdów w symulacji.
 """
 
+import heapq
+import itertools
+import math
 import random
-from typing import List, Callable, Optional
-from vehicle import Vehicle, VehicleController, VehicleState
+from typing import Dict, List, Callable, Optional, Tuple, Union
+from vehicle import Vehicle, VehicleController, VehicleState, PathFinder
 from graph import RoadNetwork, Intersection
-from typing import Optional
-try:
-    from traffic_monitor import TrafficMonitor
-except Exception:
-    TrafficMonitor = None
+from traffic_monitor import TrafficMonitor, NullTrafficMonitor, NULL_MONITOR
+
+
+def _choose_destination(network: RoadNetwork, exclude_id: int) -> Optional[Intersection]:
+    """
+    Losuje cel spośród skrzyżowań docelowych sieci, z pominięciem exclude_id.
+    
+    Losuje indeks z buforowanej krotki i ponawia próbę przy trafieniu w
+    wykluczone skrzyżowanie (oczekiwana liczba ponowień ≈ 1/N), więc nie
+    tworzy przefiltrowanej listy przy każdym wywołaniu.
+    """
+    destinations = network.get_destinations()
+    count = len(destinations)
+    if count == 0:
+        return None
+    if count == 1:
+        return None if destinations[0].id == exclude_id else destinations[0]
+    
+    while True:
+        candidate = destinations[random.randrange(count)]
+        if candidate.id != exclude_id:
+            return candidate
 
 
 class VehicleSpawner:
     """Generuje nowe pojazdy w losowych odstępach czasu."""
     
+    __slots__ = ('spawn_intersection', 'network', '_spawn_rate', '_draw',
+                 'speed_min', 'speed_max', 'next_spawn_time', '_time')
+    
     def __init__(self,
                  spawn_intersection: Intersection,
                  network: RoadNetwork,
                  spawn_rate: float = 0.25,
                  speed_min: float = 30.0,
-                 speed_max: float = 80.0):
+                 speed_max: float = 80.0,
+                 start_time: float = 0.0):
         """
         Inicjalizuje generator pojazdów.
         
@@ -31,6 +55,7 @@ class VehicleSpawner:
             spawn_rate: Średnia liczba pojazdów na sekundę (λ)
             speed_min: Minimalna prędkość pojazdu (km/h)
             speed_max: Maksymalna prędkość pojazdu (km/h)
+            start_time: Czas symulacji, od którego liczony jest pierwszy interwał
         """
         self.spawn_intersection = spawn_intersection
         self.network = network
@@ -38,21 +63,37 @@ class VehicleSpawner:
         self.speed_min = speed_min
         self.speed_max = speed_max
         
-        self.time_since_last_spawn = 0.0
-        self.next_spawn_interval = self._next_interval()
-        # Lokalny licznik ID nie jest używany — ID nadawane globalnie w flocie
-        self.vehicle_id_counter = 0
+        # Bezwzględny czas symulacji następnego spawnu
+        self.next_spawn_time = start_time + self._draw()
+        # Czas spawnera aktualizowanego samodzielnie przez update()
+        self._time = start_time
+
+    @property
+    def spawn_rate(self) -> float:
+        """Średnia liczba pojazdów na sekundę (λ)."""
+        return self._spawn_rate
 
-    def _next_interval(self) -> float:
-        """Generuj interwał czasu między zdarzeniami (rozkład wykładniczy).
+    @spawn_rate.setter
+    def spawn_rate(self, value: float):
+        self._spawn_rate = value
+        self._draw = self._make_interval_sampler(value)
+
+    @staticmethod
+    def _make_interval_sampler(spawn_rate: float) -> Callable[[], float]:
+        """Tworzy funkcję losującą interwał między zdarzeniami (rozkład wykładniczy).
 
         Interwały w procesie Poissona są niezależne i mają rozkład
         wykładniczy z parametrem λ (spawn_rate), gdzie E[T] = 1/λ.
+        Funkcja jest specjalizowana dla danego λ (odwrotność liczona raz),
+        więc losowanie nie odczytuje atrybutów ani nie sprawdza warunków.
         """
-        if self.spawn_rate <= 0:
-            return float("inf")
+        if spawn_rate <= 0:
+            return lambda: math.inf
 
-        return random.expovariate(self.spawn_rate)
+        inv_rate = 1.0 / spawn_rate
+        rnd = random.random
+        log1p = math.log1p
+        return lambda: -log1p(-rnd()) * inv_rate
     
     def _get_random_destination(self) -> Optional[Intersection]:
         """
@@ -60,47 +101,49 @@ class VehicleSpawner:
         Unika spawnu jako celu (jeśli sieć ma więcej niż 1 skrzyżowanie).
         Wybiera tylko skrzyżowania które mogą być celami (is_destination=True).
         """
-        all_intersections = self.network.get_all_intersections()
-        
-        if len(all_intersections) <= 1:
+        if self.network.num_intersections() <= 1:
             return None
         
         # Wybierz losowe, ale nie spawn_intersection i tylko te które mogą być celami
-        available = [i for i in all_intersections 
-                    if i.id != self.spawn_intersection.id and i.is_destination]
-        return random.choice(available) if available else None
+        return _choose_destination(self.network, self.spawn_intersection.id)
     
     def update(self, delta_time: float) -> Optional[Vehicle]:
         """
         Aktualizuje timer spawnu i zwraca nowy pojazd jeśli należy go stworzyć.
         
+        Do użycia, gdy spawner działa poza flotą; VehicleFleet planuje
+        spawny własną kolejką i nie wywołuje tej metody.
+        
         Args:
             delta_time: Czas upłynięty od ostatniej aktualizacji (sekundy)
         
         Returns:
-            Nowy pojazd lub None jeśli nie należy spawować
-        """
-        self.time_since_last_spawn += delta_time
-        
-        if self.time_since_last_spawn >= self.next_spawn_interval:
-            # Zachowaj nadmiar czasu (overshoot), aby nie zafałszować tempa
-            # kolejnych spawnow. Resetowanie do 0.0 powoduje systematyczne
-            # zaniżanie odstępów i zaburza średni rate.
-            self.time_since_last_spawn -= self.next_spawn_interval
-            self.next_spawn_interval = self._next_interval()
-            
-            # Utwórz nowy pojazd
-            speed = random.uniform(self.speed_min, self.speed_max)
-            # ID zostanie nadane globalnie przez flotę, użyj placeholdera
-            vehicle = Vehicle(
-                id=-1,
-                current_intersection=self.spawn_intersection,
-                speed=speed
-            )
-            
-            return vehicle
-        
+            Nowy pojazd lub None jeśli nie należy spawnować
+        """
+        self._time += delta_time
+        if self._time >= self.next_spawn_time:
+            return self.spawn()
         return None
+    
+    def spawn(self) -> Vehicle:
+        """
+        Tworzy nowy pojazd i planuje następny spawn.
+        
+        Kolejny czas jest liczony od zaplanowanego (nie rzeczywistego) czasu
+        spawnu, aby nadmiar czasu kroku nie zafałszował tempa spawnów.
+        
+        Returns:
+            Nowy pojazd (ID zostanie nadane przez flotę)
+        """
+        self.next_spawn_time += self._draw()
+        
+        speed = random.uniform(self.speed_min, self.speed_max)
+        # ID zostanie nadane globalnie przez flotę, użyj placeholdera
+        return Vehicle(
+            id=-1,
+            current_intersection=self.spawn_intersection,
+            speed=speed
+        )
 
 
 class VehicleFleet:
@@ -116,13 +159,25 @@ class VehicleFleet:
         self.network = network
         self.vehicles: List[Vehicle] = []
         self.controllers: List[VehicleController] = []
+        # Związane metody controller.update, równoległe do self.controllers
+        self._update_fns: List[Callable[[float], None]] = []
         self.spawners: List[VehicleSpawner] = []
-        self._vehicle_id_counter: int = 0
-        self.monitor: Optional[TrafficMonitor] = None
+        # Licznik zmian listy spawnerów (dla buforów zależnych od niej)
+        self.spawners_version = 0
+        self._vehicle_ids = itertools.count()
+        self.monitor: Union[TrafficMonitor, NullTrafficMonitor] = NULL_MONITOR
+        # Czas symulacji i kolejka (czas następnego spawnu, indeks spawnera)
+        self._sim_time: float = 0.0
+        self._spawn_queue: List[Tuple[float, int]] = []
+        # Pojazdy na drogach: road_id -> pojazdy, aktualizowane przez
+        # kontrolery przy zmianie drogi (bez przebudowy co krok)
+        self._road_occupants: Dict[int, List[Vehicle]] = {}
+        # Trasy do wszystkich możliwych celów liczone raz, bez BFS przy spawnie
+        PathFinder.precompute_next_hops(network)
 
     def set_monitor(self, monitor: TrafficMonitor):
         """Ustawia monitor przepustowości dla floty."""
-        self.monitor = monitor
+        self.monitor = monitor if monitor is not None else NULL_MONITOR
     
     def add_spawner(self,
                     spawn_intersection: Intersection,
@@ -146,9 +201,12 @@ class VehicleFleet:
             network=self.network,
             spawn_rate=spawn_rate,
             speed_min=speed_min,
-            speed_max=speed_max
+            speed_max=speed_max,
+            start_time=self._sim_time
         )
+        heapq.heappush(self._spawn_queue, (spawner.next_spawn_time, len(self.spawners)))
         self.spawners.append(spawner)
+        self.spawners_version += 1
         return spawner
     
     def update(self, delta_time: float):
@@ -162,32 +220,43 @@ class VehicleFleet:
             delta_time: Czas upłynięty (sekundy)
         """
         # Zaktualizuj czas monitora zanim nastąpią zdarzenia przejazdów
-        if self.monitor:
-            self.monitor.update(delta_time)
-        # Spawn nowych pojazdów
-        for spawner in self.spawners:
-            new_vehicle = spawner.update(delta_time)
-            if new_vehicle:
-                self.add_vehicle(new_vehicle)
-        
-        # Zaktualizuj listę innych pojazdów dla każdego kontrolera
-        for controller in self.controllers:
-            controller.other_vehicles = self.vehicles
+        self.monitor.update(delta_time)
+        # Spawn nowych pojazdów - sprawdzane są tylko spawnery, których
+        # zaplanowany czas już minął (każdy co najwyżej raz na krok)
+        self._sim_time += delta_time
+        queue = self._spawn_queue
+        if queue and queue[0][0] <= self._sim_time:
+            fired = []
+            while queue and queue[0][0] <= self._sim_time:
+                fired.append(heapq.heappop(queue)[1])
+            fired.sort()
+            for index in fired:
+                spawner = self.spawners[index]
+                self.add_vehicle(spawner.spawn())
+                heapq.heappush(queue, (spawner.next_spawn_time, index))
         
         # Aktualizuj istniejące pojazdy
-        for controller in self.controllers:
-            controller.update(delta_time)
-        
-        # Usuń pojazdy które dotarły do celu
-        vehicles_to_remove = []
-        for i, vehicle in enumerate(self.vehicles):
-            if vehicle.state == VehicleState.ARRIVED:
-                vehicles_to_remove.append(i)
-        
-        # Usuń od konca aby nie zniszczyć indeksów
-        for i in reversed(vehicles_to_remove):
-            removed_vehicle = self.vehicles.pop(i)
-            self.controllers.pop(i)
+        for update_fn in self._update_fns:
+            update_fn(delta_time)
+        
+        # Usuń pojazdy które dotarły do celu - kompaktowanie w miejscu bez
+        # list tymczasowych (kontrolery trzymają referencję do self.vehicles)
+        vehicles = self.vehicles
+        controllers = self.controllers
+        update_fns = self._update_fns
+        write = 0
+        for read in range(len(vehicles)):
+            vehicle = vehicles[read]
+            if vehicle.state != VehicleState.ARRIVED:
+                if write != read:
+                    vehicles[write] = vehicle
+                    controllers[write] = controllers[read]
+                    update_fns[write] = update_fns[read]
+                write += 1
+        if write < len(vehicles):
+            del vehicles[write:]
+            del controllers[write:]
+            del update_fns[write:]
     
     def add_vehicle(self, vehicle: Vehicle) -> VehicleController:
         """
@@ -200,12 +269,15 @@ class VehicleFleet:
             Kontroler pojazdu
         """
         # Nadaj globalnie unikalne ID
-        vehicle.id = self._vehicle_id_counter
-        self._vehicle_id_counter += 1
+        vehicle.id = next(self._vehicle_ids)
 
         self.vehicles.append(vehicle)
         controller = VehicleController(vehicle, self.network, self.monitor)
+        # Referencje ustawiane raz - lista i siatka są modyfikowane w miejscu
+        controller.other_vehicles = self.vehicles
+        controller.road_occupants = self._road_occupants
         self.controllers.append(controller)
+        self._update_fns.append(controller.update)
         
         # Wylosuj cel
         destination = self._get_random_destination(vehicle.current_intersection)
@@ -219,15 +291,33 @@ class VehicleFleet:
         Wybiera losowy cel, unikając danego skrzyżowania.
         Wybiera tylko skrzyżowania które mogą być celami (is_destination=True).
         """
-        all_intersections = self.network.get_all_intersections()
-        available = [i for i in all_intersections 
-                    if i.id != exclude_intersection.id and i.is_destination]
-        return random.choice(available) if available else None
+        return _choose_destination(self.network, exclude_intersection.id)
     
     def get_vehicles(self) -> List[Vehicle]:
         """Zwraca listę wszystkich aktywnych pojazdów."""
         return self.vehicles.copy()
     
+    def get_positions(self) -> List[Tuple[float, float]]:
+        """
+        Zwraca pozycje wszystkich aktywnych pojazdów (w kolejności self.vehicles).
+        
+        Liczone w jednej pętli z wektorów dróg, bez wywołania metody na pojazd.
+        """
+        positions = []
+        append = positions.append
+        for vehicle in self.vehicles:
+            road = vehicle.current_road
+            progress = vehicle.progress_on_road
+            if road is None or progress <= 0.0:
+                intersection = vehicle.current_intersection
+                append((intersection.x, intersection.y))
+            else:
+                if progress > 1.0:
+                    progress = 1.0
+                start = road.from_intersection
+                append((start.x + road.dx * progress, start.y + road.dy * progress))
+        return positions
+    
     def num_vehicles(self) -> int:
         """Zwraca liczbę aktywnych pojazdów."""
         return len(self.vehicles)
@@ -3,9 +3,11 @@ Moduł do reprezentacji sieci drogowej jako grafu.
 Wierzchołki to skrzyżowania, krawędzie to drogi.
 """
 
-from typing import Dict, List, Optional, Set, Tuple
+from typing import AbstractSet, Dict, List, Optional, Set, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
+from functools import lru_cache
+import itertools
 import math
 
 
@@ -15,11 +17,33 @@ class TrafficLightState(Enum):
     RED = "red"
 
 
-@dataclass
+@dataclass(slots=True)
 class TrafficLightPhase:
-    """Reprezentuje jedną fazę sygnalizacji (które kierunki mają zielone)."""
+    """Reprezentuje jedną fazę sygnalizacji (które kierunki mają zielone).
+    
+    Maska allowed_mask jest liczona z allowed_directions przy tworzeniu fazy
+    i w set_allowed_directions(); po zmianie zbioru w miejscu (np. add())
+    należy wywołać set_allowed_directions(), aby odświeżyć maskę.
+    """
     allowed_directions: Set[int]  # ID skrzyżowań z których można wjechać
     duration: float  # Czas trwania fazy w sekundach
+    allowed_mask: int = field(init=False, repr=False)  # Bit k = kierunek k dozwolony
+    
+    def __post_init__(self):
+        self.set_allowed_directions(self.allowed_directions)
+    
+    def set_allowed_directions(self, directions: AbstractSet[int]):
+        """
+        Ustawia kierunki z zielonym światłem i przelicza maskę.
+        
+        Args:
+            directions: ID skrzyżowań z których można wjechać
+        """
+        mask = 0
+        for direction in directions:
+            mask |= 1 << direction
+        self.allowed_directions = set(directions)
+        self.allowed_mask = mask
 
 
 class TrafficLightController:
@@ -93,8 +117,8 @@ class TrafficLightController:
         Returns:
             True jeśli zielone dla tego kierunku
         """
-        current_phase = self.phases[self.current_phase_index]
-        return from_intersection_id in current_phase.allowed_directions
+        mask = self.phases[self.current_phase_index].allowed_mask
+        return bool((mask >> from_intersection_id) & 1)
     
     def is_red_for_direction(self, from_intersection_id: int) -> bool:
         """
@@ -165,9 +189,17 @@ class TrafficLight:
         return True
 
 
-@dataclass
+# Atrybuty skrzyżowania, z których RoadNetwork buduje buforowane listy
+_NETWORK_CACHED_ATTRS = frozenset({'is_destination', 'traffic_light', 'traffic_light_controller'})
+
+
+@dataclass(slots=True, eq=False)
 class Intersection:
-    """Reprezentuje skrzyżowanie (wierzchołek grafu)."""
+    """Reprezentuje skrzyżowanie (wierzchołek grafu).
+    
+    Zmiana is_destination lub sygnalizacji skrzyżowania należącego do sieci
+    unieważnia bufory sieci (RoadNetwork.invalidate_caches()).
+    """
     
     id: int
     name: str
@@ -176,6 +208,18 @@ class Intersection:
     traffic_light: Optional[TrafficLight] = None
     traffic_light_controller: Optional[TrafficLightController] = None
     is_destination: bool = True  # Czy skrzyżowanie może być celem podróży
+    # Drogi wychodzące według ID skrzyżowania docelowego (wypełniane przez RoadNetwork)
+    outgoing_by_target: Dict[int, 'Road'] = field(default_factory=dict, repr=False)
+    # Sieć, do której należy skrzyżowanie (ustawiana przez RoadNetwork)
+    _network: Optional['RoadNetwork'] = field(default=None, init=False, repr=False)
+    
+    def __setattr__(self, name: str, value):
+        object.__setattr__(self, name, value)
+        if name in _NETWORK_CACHED_ATTRS:
+            # Podczas __init__ pole _network nie jest jeszcze ustawione
+            network = getattr(self, '_network', None)
+            if network is not None:
+                network.invalidate_caches()
     
     def __repr__(self) -> str:
         return f"Intersection(id={self.id}, name='{self.name}', pos=({self.x}, {self.y}))"
@@ -189,16 +233,70 @@ class Intersection:
         return self.id == other.id
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
+class RoadSpec:
+    """Parametry klasy drogi współdzielone przez wiele dróg (flyweight)."""
+    
+    speed_limit: float  # km/h
+    lanes: int = 1
+
+
+@lru_cache(maxsize=None)
+def road_spec(speed_limit: float, lanes: int = 1) -> RoadSpec:
+    """Zwraca współdzieloną instancję RoadSpec dla podanych parametrów."""
+    return RoadSpec(speed_limit=speed_limit, lanes=lanes)
+
+
+@dataclass(slots=True, eq=False, init=False)
 class Road:
-    """Reprezentuje drogę (krawędź grafu)."""
+    """Reprezentuje drogę (krawędź grafu).
+    
+    Ograniczenie prędkości i liczba pasów są przechowywane we współdzielonym
+    RoadSpec (patrz road_spec). Konstruktor przyjmuje je bezpośrednio,
+    a przypisanie speed_limit lub lanes podmienia spec drogi.
+    """
     
     id: int
     from_intersection: Intersection
     to_intersection: Intersection
     length: float
-    speed_limit: float  # km/h
-    lanes: int = 1
+    spec: RoadSpec
+    # Wektor od początku do końca drogi (do interpolacji pozycji pojazdów)
+    dx: float = field(repr=False, default=0.0)
+    dy: float = field(repr=False, default=0.0)
+    
+    def __init__(self,
+                 id: int,
+                 from_intersection: Intersection,
+                 to_intersection: Intersection,
+                 length: float,
+                 speed_limit: float,
+                 lanes: int = 1):
+        self.id = id
+        self.from_intersection = from_intersection
+        self.to_intersection = to_intersection
+        self.length = length
+        self.spec = road_spec(speed_limit, lanes)
+        self.dx = to_intersection.x - from_intersection.x
+        self.dy = to_intersection.y - from_intersection.y
+    
+    @property
+    def speed_limit(self) -> float:
+        """Ograniczenie prędkości w km/h."""
+        return self.spec.speed_limit
+    
+    @speed_limit.setter
+    def speed_limit(self, value: float):
+        self.spec = road_spec(value, self.spec.lanes)
+    
+    @property
+    def lanes(self) -> int:
+        """Liczba pasów ruchu."""
+        return self.spec.lanes
+    
+    @lanes.setter
+    def lanes(self, value: int):
+        self.spec = road_spec(self.spec.speed_limit, value)
     
     def __repr__(self) -> str:
         return (f"Road(id={self.id}, "
@@ -224,8 +322,18 @@ class RoadNetwork:
         self.intersections: Dict[int, Intersection] = {}
         self.roads: Dict[int, Road] = {}
         self._adj_list: Dict[int, List[Road]] = {}
-        self._intersection_counter = 0
-        self._road_counter = 0
+        self._in_adj_list: Dict[int, List[Road]] = {}  # Drogi wchodzące
+        # Generatory kolejnych ID (ID są gęste: 0..N-1)
+        self._intersection_ids = itertools.count()
+        self._road_ids = itertools.count()
+        self._destinations_cache: Optional[Tuple[Intersection, ...]] = None
+        # Buforowana lista sygnalizacji (TrafficLight / TrafficLightController)
+        self._signals_cache: Optional[Tuple] = None
+        # Licznik zmian skrzyżowań i ich atrybutów (zwiększany przez invalidate_caches())
+        self.attributes_version = 0
+        
+        # Licznik zmian topologii (klucz buforów ścieżek)
+        self.topology_version = 0
     
     def add_intersection(self, name: str, x: float, y: float) -> Intersection:
         """
@@ -240,16 +348,44 @@ class RoadNetwork:
             Utworzone skrzyżowanie
         """
         intersection = Intersection(
-            id=self._intersection_counter,
+            id=next(self._intersection_ids),
             name=name,
             x=x,
             y=y
         )
+        intersection._network = self
         self.intersections[intersection.id] = intersection
         self._adj_list[intersection.id] = []
-        self._intersection_counter += 1
+        self._in_adj_list[intersection.id] = []
+        self.invalidate_caches()
+        self.topology_version += 1
         return intersection
     
+    def add_intersections_bulk(self,
+                               intersections: List[Tuple[str, float, float]]) -> List[Intersection]:
+        """
+        Dodaje wiele skrzyżowań w jednym wywołaniu.
+        
+        Args:
+            intersections: Lista krotek (name, x, y)
+        
+        Returns:
+            Lista utworzonych skrzyżowań (w kolejności wejściowej)
+        """
+        ids = self._intersection_ids
+        created = [
+            Intersection(id=next(ids), name=name, x=x, y=y)
+            for name, x, y in intersections
+        ]
+        for intersection in created:
+            intersection._network = self
+            self.intersections[intersection.id] = intersection
+            self._adj_list[intersection.id] = []
+            self._in_adj_list[intersection.id] = []
+        self.invalidate_caches()
+        self.topology_version += 1
+        return created
+    
     def add_road(self,
                  from_id: int,
                  to_id: int,
@@ -271,21 +407,15 @@ class RoadNetwork:
         Raises:
             ValueError: Jeśli któreś ze skrzyżowań nie istnieje
         """
-        if from_id not in self.intersections or to_id not in self.intersections:
-            raise ValueError(
-                f"Jedno ze skrzyżowań nie istnieje (from_id={from_id}, to_id={to_id})"
-            )
+        self._check_endpoints(from_id, to_id)
         
         # Oblicz długość drogi na podstawie współrzędnych skrzyżowań
         from_intersection = self.intersections[from_id]
         to_intersection = self.intersections[to_id]
-        length = math.sqrt(
-            (to_intersection.x - from_intersection.x) ** 2 +
-            (to_intersection.y - from_intersection.y) ** 2
-        )
+        length = self._distance(from_intersection, to_intersection)
         
         road = Road(
-            id=self._road_counter,
+            id=next(self._road_ids),
             from_intersection=from_intersection,
             to_intersection=to_intersection,
             length=length,
@@ -294,7 +424,9 @@ class RoadNetwork:
         )
         self.roads[road.id] = road
         self._adj_list[from_id].append(road)
-        self._road_counter += 1
+        self._in_adj_list[to_id].append(road)
+        self._index_road(road)
+        self.topology_version += 1
         return road
     
     def add_two_way_road(self,
@@ -315,9 +447,116 @@ class RoadNetwork:
         Returns:
             Tupla z dwiema utworzonymi drogami (tam i z powrotem)
         """
-        road_1_to_2 = self.add_road(from_id, to_id, speed_limit, lanes)
-        road_2_to_1 = self.add_road(to_id, from_id, speed_limit, lanes)
-        return (road_1_to_2, road_2_to_1)
+        return self.add_two_way_roads_bulk([(from_id, to_id, speed_limit, lanes)])[0]
+    
+    def add_roads_bulk(self,
+                       roads: List[Tuple[int, int, float, int]]) -> List[Road]:
+        """
+        Dodaje wiele dróg jednokierunkowych w jednym wywołaniu.
+        Wszystkie skrzyżowania są sprawdzane przed wstawieniem, więc w razie
+        błędu sieć pozostaje niezmieniona.
+        
+        Args:
+            roads: Lista krotek (from_id, to_id, speed_limit, lanes)
+        
+        Returns:
+            Lista utworzonych dróg (w kolejności wejściowej)
+        
+        Raises:
+            ValueError: Jeśli któreś ze skrzyżowań nie istnieje
+        """
+        for from_id, to_id, _, _ in roads:
+            self._check_endpoints(from_id, to_id)
+        
+        intersections = self.intersections
+        edges = []
+        for from_id, to_id, speed_limit, lanes in roads:
+            a = intersections[from_id]
+            b = intersections[to_id]
+            edges.append((a, b, self._distance(a, b), speed_limit, lanes))
+        return self._insert_roads(edges)
+    
+    def add_two_way_roads_bulk(self,
+                               roads: List[Tuple[int, int, float, int]]) -> List[Tuple[Road, Road]]:
+        """
+        Dodaje wiele dróg dwukierunkowych w jednym wywołaniu.
+        Długość i parametry drogi są wyznaczane raz dla obu kierunków.
+        
+        Args:
+            roads: Lista krotek (from_id, to_id, speed_limit, lanes)
+        
+        Returns:
+            Lista tupli z parami utworzonych dróg (tam i z powrotem)
+        
+        Raises:
+            ValueError: Jeśli któreś ze skrzyżowań nie istnieje
+        """
+        for from_id, to_id, _, _ in roads:
+            self._check_endpoints(from_id, to_id)
+        
+        intersections = self.intersections
+        edges = []
+        for from_id, to_id, speed_limit, lanes in roads:
+            a = intersections[from_id]
+            b = intersections[to_id]
+            length = self._distance(a, b)
+            edges.append((a, b, length, speed_limit, lanes))
+            edges.append((b, a, length, speed_limit, lanes))
+        created = self._insert_roads(edges)
+        return list(zip(created[0::2], created[1::2]))
+    
+    def _insert_roads(self,
+                      edges: List[Tuple[Intersection, Intersection, float, float, int]]) -> List[Road]:
+        """
+        Tworzy drogi z przygotowanych krotek (from, to, length, speed_limit, lanes)
+        i dopisuje je do sieci.
+        """
+        ids = self._road_ids
+        created = [
+            Road(
+                id=next(ids),
+                from_intersection=a,
+                to_intersection=b,
+                length=length,
+                speed_limit=speed_limit,
+                lanes=lanes
+            )
+            for a, b, length, speed_limit, lanes in edges
+        ]
+        
+        # Pogrupuj drogi według skrzyżowania początkowego i końcowego, aby każdą
+        # listę sąsiedztwa rozszerzyć jednym wywołaniem (co najwyżej jedna realokacja)
+        outgoing: Dict[int, List[Road]] = {}
+        incoming: Dict[int, List[Road]] = {}
+        for road in created:
+            self.roads[road.id] = road
+            outgoing.setdefault(road.from_intersection.id, []).append(road)
+            incoming.setdefault(road.to_intersection.id, []).append(road)
+            self._index_road(road)
+        for from_id, new_roads in outgoing.items():
+            self._adj_list[from_id].extend(new_roads)
+        for to_id, new_roads in incoming.items():
+            self._in_adj_list[to_id].extend(new_roads)
+        self.topology_version += 1
+        return created
+    
+    @staticmethod
+    def _index_road(road: Road):
+        """Dopisuje drogę do indeksu dróg wychodzących skrzyżowania początkowego."""
+        # Pierwsza dodana droga wygrywa, tak jak przy przeszukiwaniu listy sąsiedztwa
+        road.from_intersection.outgoing_by_target.setdefault(road.to_intersection.id, road)
+    
+    def _check_endpoints(self, from_id: int, to_id: int):
+        """Sprawdza czy oba skrzyżowania drogi istnieją."""
+        if from_id not in self.intersections or to_id not in self.intersections:
+            raise ValueError(
+                f"Jedno ze skrzyżowań nie istnieje (from_id={from_id}, to_id={to_id})"
+            )
+    
+    @staticmethod
+    def _distance(a: Intersection, b: Intersection) -> float:
+        """Zwraca odległość euklidesową między dwoma skrzyżowaniami."""
+        return math.hypot(b.x - a.x, b.y - a.y)
     
     def get_intersection(self, intersection_id: int) -> Optional[Intersection]:
         """Zwraca skrzyżowanie o danym ID."""
@@ -333,6 +572,12 @@ class RoadNetwork:
             raise ValueError(f"Skrzyżowanie {intersection_id} nie istnieje")
         return self._adj_list[intersection_id]
     
+    def get_incoming_roads(self, intersection_id: int) -> List[Road]:
+        """Zwraca wszystkie drogi wchodzące do skrzyżowania."""
+        if intersection_id not in self._in_adj_list:
+            raise ValueError(f"Skrzyżowanie {intersection_id} nie istnieje")
+        return self._in_adj_list[intersection_id]
+    
     def get_neighbors(self, intersection_id: int) -> List[Intersection]:
         """Zwraca wszystkie sąsiadujące skrzyżowania."""
         neighbors = []
@@ -344,15 +589,69 @@ class RoadNetwork:
                          from_id: int,
                          to_id: int) -> Optional[Road]:
         """Zwraca drogę między dwoma skrzyżowaniami, jeśli istnieje."""
-        for road in self.get_outgoing_roads(from_id):
-            if road.to_intersection.id == to_id:
-                return road
-        return None
+        intersection = self.intersections.get(from_id)
+        if intersection is None:
+            raise ValueError(f"Skrzyżowanie {from_id} nie istnieje")
+        return intersection.outgoing_by_target.get(to_id)
     
     def get_all_intersections(self) -> List[Intersection]:
         """Zwraca listę wszystkich skrzyżowań."""
         return list(self.intersections.values())
     
+    def invalidate_caches(self):
+        """
+        Unieważnia buforowane listy celów podróży i sygnalizacji.
+        
+        Wywoływana przy dodaniu skrzyżowania i zmianie jego atrybutów
+        użytych w buforach; każde wywołanie zwiększa attributes_version.
+        """
+        self._destinations_cache = None
+        self._signals_cache = None
+        self.attributes_version += 1
+    
+    def get_destinations(self) -> Tuple[Intersection, ...]:
+        """
+        Zwraca skrzyżowania, które mogą być celem podróży (is_destination=True).
+        
+        Wynik jest buforowany do czasu wywołania invalidate_caches(), co
+        następuje także przy zmianie is_destination skrzyżowania.
+        """
+        if self._destinations_cache is None:
+            self._destinations_cache = tuple(
+                i for i in self.intersections.values() if i.is_destination
+            )
+        return self._destinations_cache
+    
+    def get_traffic_signals(self) -> Tuple:
+        """
+        Zwraca wszystkie sygnalizacje sieci (TrafficLight i TrafficLightController).
+        
+        Wynik jest buforowany tak jak get_destinations(); przypisanie
+        sygnalizacji do skrzyżowania unieważnia bufor.
+        """
+        if self._signals_cache is None:
+            signals = []
+            for intersection in self.intersections.values():
+                if intersection.traffic_light:
+                    signals.append(intersection.traffic_light)
+                if intersection.traffic_light_controller:
+                    signals.append(intersection.traffic_light_controller)
+            self._signals_cache = tuple(signals)
+        return self._signals_cache
+    
+    def update_traffic_lights(self, delta_time: float):
+        """
+        Aktualizuje wszystkie sygnalizacje w sieci.
+        
+        Iteruje tylko po skrzyżowaniach posiadających sygnalizację, zamiast
+        sprawdzać każde skrzyżowanie osobno w każdej klatce.
+        
+        Args:
+            delta_time: Czas upłynięty (sekundy)
+        """
+        for signal in self.get_traffic_signals():
+            signal.update(delta_time)
+    
     def get_all_roads(self) -> List[Road]:
         """Zwraca listę wszystkich dróg."""
         return list(self.roads.values())
@@ -3,13 +3,15 @@ Główny plik testowy sieciulatora ruchu drogowego.
 """
 
 from examples import create_example_network
-from visualization import RoadNetworkVisualizer
 from fleet import VehicleFleet
 from traffic_monitor import TrafficMonitor
 
 
 def main():
     """Główna funkcja programu."""
+    # Import wizualizacji (pygame) dopiero przy uruchomieniu, aby import
+    # modułu nie ładował zależności GUI
+    from visualization import RoadNetworkVisualizer
     
     # Utwórz sieć
     network = create_example_network()
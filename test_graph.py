@@ -0,0 +1,64 @@
+"""
+Testy sieci drogowej i sygnalizacji.
+
+Uruchomienie: python -m unittest test_graph
+"""
+
+import unittest
+
+from graph import RoadNetwork, TrafficLightController, TrafficLightPhase
+
+
+class TrafficLightPhaseTest(unittest.TestCase):
+
+    def test_directions_stay_a_mutable_set(self):
+        phase = TrafficLightPhase(allowed_directions={1, 3}, duration=5.0)
+        phase.allowed_directions.add(4)
+        self.assertEqual(phase.allowed_directions, {1, 3, 4})
+
+    def test_set_allowed_directions_refreshes_green(self):
+        phase = TrafficLightPhase(allowed_directions={1}, duration=5.0)
+        controller = TrafficLightController([phase])
+        self.assertFalse(controller.is_green_for_direction(2))
+        phase.allowed_directions.add(2)
+        phase.set_allowed_directions(phase.allowed_directions)
+        self.assertTrue(controller.is_green_for_direction(2))
+        phase.set_allowed_directions({3})
+        self.assertFalse(controller.is_green_for_direction(1))
+        self.assertTrue(controller.is_green_for_direction(3))
+
+    def test_green_follows_current_phase_index(self):
+        controller = TrafficLightController([
+            TrafficLightPhase(allowed_directions={1}, duration=5.0),
+            TrafficLightPhase(allowed_directions={2}, duration=5.0),
+        ])
+        controller.current_phase_index = 1
+        self.assertFalse(controller.is_green_for_direction(1))
+        self.assertTrue(controller.is_green_for_direction(2))
+
+
+
+class NetworkCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.network = RoadNetwork()
+        self.a, self.b = self.network.add_intersections_bulk([("A", 0, 0), ("B", 100, 0)])
+
+    def test_destinations_follow_is_destination(self):
+        self.assertEqual(self.network.get_destinations(), (self.a, self.b))
+        self.b.is_destination = False
+        self.assertEqual(self.network.get_destinations(), (self.a,))
+        self.b.is_destination = True
+        self.assertEqual(self.network.get_destinations(), (self.a, self.b))
+
+    def test_signals_follow_assigned_controllers(self):
+        self.assertEqual(self.network.get_traffic_signals(), ())
+        controller = TrafficLightController([TrafficLightPhase(allowed_directions={0}, duration=5.0)])
+        self.a.traffic_light_controller = controller
+        self.assertEqual(self.network.get_traffic_signals(), (controller,))
+        self.a.traffic_light_controller = None
+        self.assertEqual(self.network.get_traffic_signals(), ())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Testy wyszukiwania pojazdu przed nami (lista pojazdów drogi).
+
+Uruchomienie: python -m unittest test_vehicle
+"""
+
+import random
+import unittest
+from typing import List, Optional
+
+from examples import create_example_network
+from fleet import VehicleFleet
+from vehicle import Vehicle, VehicleController
+
+
+def _leader_by_full_scan(vehicle: Vehicle, vehicles: List[Vehicle]) -> Optional[float]:
+    """Wzorcowe przeszukanie całej floty (jak przed wprowadzeniem list dróg)."""
+    min_progress_ahead = None
+    for other in vehicles:
+        if other.id == vehicle.id:
+            continue
+        if other.current_road and other.current_road.id == vehicle.current_road.id:
+            if other.progress_on_road > vehicle.progress_on_road:
+                if min_progress_ahead is None or other.progress_on_road < min_progress_ahead:
+                    min_progress_ahead = other.progress_on_road
+    return min_progress_ahead
+
+
+class LeaderLookupTest(unittest.TestCase):
+
+    def setUp(self):
+        self.network = create_example_network()
+        self.fleet = VehicleFleet(self.network)
+
+    def _add(self, start_id: int, destination_id: int, speed: float) -> VehicleController:
+        intersections = self.network.intersections
+        controller = self.fleet.add_vehicle(Vehicle(id=-1, current_intersection=intersections[start_id], speed=speed))
+        controller.set_destination(intersections[destination_id])
+        return controller
+
+    def _assert_leaders_match_full_scan(self):
+        for controller in self.fleet.controllers:
+            vehicle = controller.vehicle
+            if vehicle.current_road is None:
+                continue
+            self.assertEqual(controller._check_vehicle_ahead(),
+                             _leader_by_full_scan(vehicle, self.fleet.vehicles),
+                             f"pojazd {vehicle.id} na drodze {vehicle.current_road.id}")
+
+    def test_matches_full_scan_in_random_traffic(self):
+        random.seed(7)
+        for intersection_id in (0, 1, 6, 8, 11, 14):
+            self.fleet.add_spawner(self.network.intersections[intersection_id], spawn_rate=1.5)
+        signals = self.network.get_traffic_signals()
+        for _ in range(600):
+            self.fleet.update(1 / 30)
+            for signal in signals:
+                signal.update(1 / 30)
+            self._assert_leaders_match_full_scan()
+
+    def test_fast_vehicle_stays_behind_slow_one(self):
+        # Oba pojazdy wjeżdżają na tę samą drogę z postępem 0.0
+        slow = self._add(0, 15, speed=10.0)
+        fast = self._add(0, 15, speed=120.0)
+        road_id = slow.vehicle.current_road.id
+        for _ in range(30):
+            self.fleet.update(0.1)
+            self._assert_leaders_match_full_scan()
+            self.assertEqual(fast.vehicle.current_road.id, road_id)
+            self.assertLess(fast.vehicle.progress_on_road, slow.vehicle.progress_on_road)
+        self.assertGreater(slow.vehicle.progress_on_road, 0.0)
+
+    def test_reroute_to_current_intersection_leaves_road(self):
+        controller = self._add(0, 15, speed=50.0)
+        self.fleet.update(0.1)
+        controller.set_destination(controller.vehicle.current_intersection)
+        self.fleet.update(0.1)
+        self.assertEqual(self.fleet.num_vehicles(), 0)
+        self.assertTrue(all(not on_road for on_road in self.fleet._road_occupants.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
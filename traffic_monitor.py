@@ -5,71 +5,147 @@ z rozbiciem na kierunki (od -> do) w czasie ostatnich 60 sekund.
 Jednostka: pojazdy/minutę.
 """
 
-from collections import defaultdict, deque
-from dataclasses import dataclass
-from typing import Dict, Tuple, Optional, Iterable
+from array import array
+from collections import deque
+from typing import Deque, Dict, List, Tuple, Optional, Iterable
 
 
-@dataclass(frozen=True)
-class DirectionKey:
-    """Klucz kierunku przejazdu przez skrzyżowanie.
-    from_id: ID skrzyżowania, z którego pojazd wjechał na skrzyżowanie
-    to_id: ID skrzyżowania, do którego pojazd wyjechał ze skrzyżowania (None dla celu)
+_ID_MASK = 0xFFFFFFFF  # ID zajmuje 32 bity; wartość maski oznacza brak to_id (cel)
+
+
+def _pack_key(intersection_id: int, from_id: int, to_id: Optional[int]) -> int:
+    """Pakuje kierunek (skrzyżowanie, from -> to) w jedną liczbę całkowitą.
+
+    Klucz w postaci int nie wymaga tworzenia krotki ani obiektu przy każdym
+    przejeździe, a jego hash jest liczony bez przeglądania elementów.
     """
-    from_id: int
-    to_id: Optional[int]
+    to_bits = _ID_MASK if to_id is None else to_id & _ID_MASK
+    return (intersection_id << 64) | ((from_id & _ID_MASK) << 32) | to_bits
 
 
 class TrafficMonitor:
     """Monitor przepustowości przejazdów przez skrzyżowania.
 
-    Przechowuje dla każdego skrzyżowania mapę (from->to) -> lista znaczników czasu zdarzeń
-    i udostępnia metryki w oknie ostatnich `window_seconds`.
+    Każdy kierunek (skrzyżowanie, from -> to) dostaje przy pierwszym przejeździe
+    indeks kolumny z bieżącą liczbą zdarzeń w oknie. Wszystkie zdarzenia trafiają
+    do jednego globalnego dziennika uporządkowanego według czasu, z którego
+    początku usuwane są zdarzenia starsze niż `window_seconds`.
     """
 
     def __init__(self, window_seconds: float = 60.0):
         self.window_seconds = max(1.0, window_seconds)
         self._time: float = 0.0
-        # events[intersection_id][DirectionKey] = deque[timestamps]
-        self._events: Dict[int, Dict[DirectionKey, deque]] = defaultdict(lambda: defaultdict(deque))
+        # Dziennik zdarzeń (czas, indeks kierunku) w kolejności rejestracji
+        self._log: Deque[Tuple[float, int]] = deque()
+        # Spakowany klucz kierunku (patrz _pack_key) -> indeks kierunku
+        self._index: Dict[int, int] = {}
+        # intersection_id -> [((from_id, to_id), indeks kierunku)]
+        self._by_intersection: Dict[int, List[Tuple[Tuple[int, Optional[int]], int]]] = {}
+        # totals[indeks] = liczba zdarzeń kierunku w oknie
+        self._totals = array('l')
 
     @property
     def time(self) -> float:
         return self._time
 
     def update(self, delta_time: float) -> None:
-        """Aktualizuje czas monitora i usuwa stare zdarzenia spoza okna."""
-        if delta_time <= 0:
-            return
-        self._time += delta_time
+        """Aktualizuje czas monitora.
+
+        Stare zdarzenia są usuwane leniwie (_prune) - przy rejestracji
+        przejazdu i przed odczytem metryk, a nie w każdej klatce.
+        """
+        if delta_time > 0:
+            self._time += delta_time
+
+    def _prune(self) -> None:
+        """Usuwa zdarzenia spoza okna.
+
+        Dziennik jest uporządkowany według czasu, więc wystarczy zdejmować
+        zdarzenia z jego początku; gdy nic nie wygasło, koszt jest stały.
+        """
         cutoff = self._time - self.window_seconds
-        # Prune stare wpisy efektywnie, tylko istniejące klucze
-        for intersection_id, dir_map in self._events.items():
-            for key, dq in dir_map.items():
-                while dq and dq[0] < cutoff:
-                    dq.popleft()
+        log = self._log
+        totals = self._totals
+        while log and log[0][0] < cutoff:
+            totals[log.popleft()[1]] -= 1
 
     def record_pass(self, intersection_id: int, from_id: int, to_id: Optional[int]) -> None:
         """Rejestruje przejazd pojazdu przez skrzyżowanie."""
-        key = DirectionKey(from_id=from_id, to_id=to_id)
-        self._events[intersection_id][key].append(self._time)
+        self._prune()
+        column = self._index.get(_pack_key(intersection_id, from_id, to_id))
+        if column is None:
+            column = self._add_direction(intersection_id, from_id, to_id)
+        self._log.append((self._time, column))
+        self._totals[column] += 1
+
+    def _add_direction(self, intersection_id: int, from_id: int, to_id: Optional[int]) -> int:
+        """Przydziela kolumnę liczników nowemu kierunkowi."""
+        column = len(self._totals)
+        self._index[_pack_key(intersection_id, from_id, to_id)] = column
+        self._by_intersection.setdefault(intersection_id, []).append(((from_id, to_id), column))
+        self._totals.append(0)
+        return column
 
     def get_rates_for_intersection(self, intersection_id: int) -> Dict[Tuple[int, Optional[int]], int]:
         """Zwraca mapę (from_id, to_id) -> liczba pojazdów/min w okresie 60 s."""
-        dir_map = self._events.get(intersection_id, {})
-        return {(k.from_id, k.to_id): len(dq) for k, dq in dir_map.items()}
+        self._prune()
+        totals = self._totals
+        return {direction: totals[column]
+                for direction, column in self._by_intersection.get(intersection_id, ())}
 
     def get_total_rate_for_intersection(self, intersection_id: int) -> int:
         """Zwraca sumaryczną liczbę pojazdów/min przez skrzyżowanie w okresie 60 s."""
-        dir_map = self._events.get(intersection_id, {})
-        return sum(len(dq) for dq in dir_map.values())
+        self._prune()
+        totals = self._totals
+        return sum(totals[column] for _, column in self._by_intersection.get(intersection_id, ()))
 
     def get_all_intersections_rates(self) -> Dict[int, Dict[Tuple[int, Optional[int]], int]]:
         """Zwraca informację dla wszystkich skrzyżowań."""
-        return {iid: {(k.from_id, k.to_id): len(dq) for k, dq in dir_map.items()}
-                for iid, dir_map in self._events.items()}
+        return {iid: self.get_rates_for_intersection(iid) for iid in self._by_intersection}
 
     def clear(self) -> None:
         """Czyści wszystkie zarejestrowane zdarzenia i resetuje czas."""
-        self._events.clear()
+        self._index.clear()
+        self._by_intersection.clear()
+        self._log.clear()
+        self._totals = array('l')
         self._time = 0.0
+
+
+class NullTrafficMonitor:
+    """Monitor, który niczego nie rejestruje (wzorzec null object).
+
+    Używany domyślnie przez flotę i kontrolery pojazdów, aby wywołania
+    update/record_pass nie wymagały sprawdzania, czy monitor jest ustawiony.
+    Wartość logiczna obiektu to False, więc `if not monitor` nadal działa.
+    """
+
+    __slots__ = ()
+
+    def __bool__(self) -> bool:
+        return False
+
+    @property
+    def time(self) -> float:
+        return 0.0
+
+    def update(self, delta_time: float) -> None:
+        pass
+
+    def record_pass(self, intersection_id: int, from_id: int, to_id: Optional[int]) -> None:
+        pass
+
+    def get_rates_for_intersection(self, intersection_id: int) -> Dict[Tuple[int, Optional[int]], int]:
+        return {}
+
+    def get_total_rate_for_intersection(self, intersection_id: int) -> int:
+        return 0
+
+    def get_all_intersections_rates(self) -> Dict[int, Dict[Tuple[int, Optional[int]], int]]:
+        return {}
+
+    def clear(self) -> None:
+        pass
+
+
+NULL_MONITOR = NullTrafficMonitor()
@@ -2,28 +2,29 @@
 Moduł do reprezentacji samochodów i ich nawigacji w sieci drogowej.
 """
 
-from typing import List, Optional, Deque
-from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from array import array
 from dataclasses import dataclass, field
-from enum import Enum
+from enum import IntEnum
 import math
+import weakref
 
 from graph import RoadNetwork, Intersection, Road
-from typing import Optional as _OptionalTrafficMonitor  # avoid type conflict
-try:
-    from traffic_monitor import TrafficMonitor
-except Exception:
-    TrafficMonitor = None  # type: ignore
+from traffic_monitor import TrafficMonitor, NullTrafficMonitor, NULL_MONITOR
 
 
-class VehicleState(Enum):
-    """Stany pojazdu."""
-    IDLE = "idle"                    # Stoi na miejscu
-    DRIVING = "driving"              # Jedzie
-    ARRIVED = "arrived"              # Dotarł do celu
+# Przelicznik km/h -> m/s
+_KMH_TO_MPS = 1000.0 / 3600.0
 
 
-@dataclass
+class VehicleState(IntEnum):
+    """Stany pojazdu (IntEnum - porównania stanu to porównania liczb)."""
+    IDLE = 0                         # Stoi na miejscu
+    DRIVING = 1                      # Jedzie
+    ARRIVED = 2                      # Dotarł do celu
+
+
+@dataclass(slots=True)
 class Vehicle:
     """Reprezentuje samochód w sieci."""
     
@@ -41,10 +42,14 @@ class Vehicle:
     progress_on_road: float = 0.0  # Procent drogi (0.0 - 1.0)
     current_road: Optional[Road] = None  # Aktualna droga
     
+    # Wartość pochodna ustawiana przy wjeździe na drogę (VehicleController);
+    # speed jest czytane w każdym kroku, więc jego zmiana działa od razu
+    _inv_length: float = field(default=0.0, init=False, repr=False)  # 1 / długość drogi
+    
     def __repr__(self) -> str:
         return (f"Vehicle(id={self.id}, "
                 f"pos={self.current_intersection.name}, "
-                f"state={self.state.value}, "
+                f"state={self.state.name.lower()}, "
                 f"dest={self.destination.name if self.destination else 'None'})")
     
     def get_current_position(self) -> tuple[float, float]:
@@ -53,18 +58,13 @@ class Vehicle:
             return self.current_intersection.x, self.current_intersection.y
         
         # Interpoluj pozycję między start a end drogi
-        x1 = self.current_road.from_intersection.x
-        y1 = self.current_road.from_intersection.y
-        x2 = self.current_road.to_intersection.x
-        y2 = self.current_road.to_intersection.y
+        road = self.current_road
+        start = road.from_intersection
         
         # Ogranicz postęp do [0, 1]
-        progress = min(1.0, max(0.0, self.progress_on_road))
-        
-        x = x1 + (x2 - x1) * progress
-        y = y1 + (y2 - y1) * progress
+        progress = min(1.0, self.progress_on_road)
         
-        return x, y
+        return start.x + road.dx * progress, start.y + road.dy * progress
     
     def has_reached_destination(self) -> bool:
         """Sprawdza czy pojazd dotarł do celu."""
@@ -72,6 +72,43 @@ class Vehicle:
                 self.current_intersection == self.destination)
 
 
+# Tablice następnych kroków: sieć -> (topology_version, {ID celu: kolumna})
+# kolumna[v] = następne skrzyżowanie na najkrótszej ścieżce z v do celu (-1 = brak)
+_next_hop_tables: "weakref.WeakKeyDictionary[RoadNetwork, Tuple[int, Dict[int, array]]]" = \
+    weakref.WeakKeyDictionary()
+
+
+def _next_hop_column(network: RoadNetwork, end_id: int) -> array:
+    """
+    Zwraca kolumnę tablicy następnych kroków dla celu end_id.
+    
+    Kolumna jest liczona raz (BFS wstecz od celu po drogach wchodzących)
+    i przechowywana do czasu zmiany topologii sieci.
+    """
+    entry = _next_hop_tables.get(network)
+    if entry is None or entry[0] != network.topology_version:
+        entry = (network.topology_version, {})
+        _next_hop_tables[network] = entry
+    
+    columns = entry[1]
+    column = columns.get(end_id)
+    if column is None:
+        column = array('i', [-1]) * len(network.intersections)
+        column[end_id] = end_id
+        frontier = [end_id]
+        while frontier:
+            next_frontier = []
+            for current_id in frontier:
+                for road in network.get_incoming_roads(current_id):
+                    neighbor_id = road.from_intersection.id
+                    if column[neighbor_id] == -1:
+                        column[neighbor_id] = current_id
+                        next_frontier.append(neighbor_id)
+            frontier = next_frontier
+        columns[end_id] = column
+    return column
+
+
 class PathFinder:
     """Klasa do wyszukiwania ścieżek w sieci drogowej."""
     
@@ -82,6 +119,10 @@ class PathFinder:
         """
         Znajduje najkrótszą ścieżkę między dwoma skrzyżowaniami (BFS).
         
+        Ścieżka jest odtwarzana z tablicy następnych kroków celu (patrz
+        find_path_by_next_hop), liczonej raz na cel do czasu zmiany
+        topologii sieci.
+        
         Args:
             network: Sieć drogowa
             start: Skrzyżowanie początkowe
@@ -90,49 +131,74 @@ class PathFinder:
         Returns:
             Lista skrzyżowań reprezentujących ścieżkę
         """
+        return PathFinder.find_path_by_next_hop(network, start, end)
+    
+    @staticmethod
+    def precompute_next_hops(network: RoadNetwork,
+                             targets: Optional[Iterable[Intersection]] = None):
+        """
+        Wylicza z góry tablice następnych kroków dla podanych celów.
+        
+        Args:
+            network: Sieć drogowa
+            targets: Skrzyżowania docelowe (domyślnie network.get_destinations())
+        """
+        if targets is None:
+            targets = network.get_destinations()
+        for target in targets:
+            _next_hop_column(network, target.id)
+    
+    @staticmethod
+    def find_path_by_next_hop(network: RoadNetwork,
+                              start: Intersection,
+                              end: Intersection) -> List[Intersection]:
+        """
+        Odtwarza najkrótszą ścieżkę z tablicy następnych kroków (bez przeszukiwania).
+        
+        Args:
+            network: Sieć drogowa
+            start: Skrzyżowanie początkowe
+            end: Skrzyżowanie docelowe
+        
+        Returns:
+            Lista skrzyżowań reprezentujących ścieżkę (pusta, jeśli brak ścieżki)
+        """
         if start == end:
             return [start]
         
-        queue: Deque = deque([(start, [start])])
-        visited = {start.id}
-        
-        while queue:
-            current, path = queue.popleft()
-            
-            # Sprawdź sąsiadów
-            for road in network.get_outgoing_roads(current.id):
-                neighbor = road.to_intersection
-                
-                if neighbor.id in visited:
-                    continue
-                
-                new_path = path + [neighbor]
-                
-                if neighbor == end:
-                    return new_path
-                
-                visited.add(neighbor.id)
-                queue.append((neighbor, new_path))
-        
-        # Brak ścieżki
-        return []
+        column = _next_hop_column(network, end.id)
+        if column[start.id] == -1:
+            return []
+        
+        intersections = network.intersections
+        path = [start]
+        current_id = start.id
+        while current_id != end.id:
+            current_id = column[current_id]
+            path.append(intersections[current_id])
+        return path
 
 
 class VehicleController:
     """Kontroler do zarządzania pojazdem i jego ruchem."""
     
-    def __init__(self, vehicle: Vehicle, network: RoadNetwork, monitor: _OptionalTrafficMonitor = None):
+    def __init__(self, vehicle: Vehicle, network: RoadNetwork, monitor: Optional[TrafficMonitor] = None):
         """
         Inicjalizuje kontroler pojazdu.
         
         Args:
             vehicle: Pojazd do kontrolowania
             network: Sieć drogowa
+            monitor: Monitor przepustowości (domyślnie monitor pusty)
         """
         self.vehicle = vehicle
         self.network = network
         self.other_vehicles: List[Vehicle] = []  # Lista innych pojazdów do sprawdzania kolizji
-        self.monitor: _OptionalTrafficMonitor = monitor
+        # Pojazdy na drogach: road_id -> pojazdy w kolejności wjazdu;
+        # aktualizowane przy zmianie drogi, jeśli ustawione, zastępuje
+        # przeszukiwanie other_vehicles
+        self.road_occupants: Optional[Dict[int, List[Vehicle]]] = None
+        self.monitor: Union[TrafficMonitor, NullTrafficMonitor] = monitor if monitor is not None else NULL_MONITOR
     
     def set_destination(self, destination: Intersection) -> bool:
         """
@@ -147,10 +213,23 @@ class VehicleController:
         if destination == self.vehicle.current_intersection:
             self.vehicle.state = VehicleState.ARRIVED
             self.vehicle.destination = destination
+            self.vehicle.progress_on_road = 0.0
+            self._enter_road(None)
             return True
         
-        # Znajdź ścieżkę
-        path = PathFinder.find_shortest_path(
+        # Cel leży na dalszej części bieżącej ścieżki - wystarczy ją skrócić
+        # (droga i postęp pojazdu pozostają bez zmian)
+        vehicle = self.vehicle
+        if vehicle.state == VehicleState.DRIVING and vehicle.current_road is not None:
+            path = vehicle.path
+            for index in range(vehicle.current_path_index + 1, len(path)):
+                if path[index].id == destination.id:
+                    del path[index + 1:]
+                    vehicle.destination = destination
+                    return True
+        
+        # Znajdź ścieżkę (tablica następnych kroków dla celu)
+        path = PathFinder.find_path_by_next_hop(
             self.network,
             self.vehicle.current_intersection,
             destination
@@ -169,14 +248,41 @@ class VehicleController:
         # Ustaw pierwszą drogę
         if len(path) > 1:
             next_intersection = path[1]
-            road = self.network.get_road_between(
-                self.vehicle.current_intersection.id,
-                next_intersection.id
-            )
-            self.vehicle.current_road = road
+            road = self.vehicle.current_intersection.outgoing_by_target.get(next_intersection.id)
+            self._enter_road(road)
         
         return True
     
+    def _enter_road(self, road: Optional[Road], distance: float = 0.0):
+        """
+        Ustawia bieżącą drogę pojazdu i buforuje wartości używane co klatkę.
+        Przenosi pojazd między listami road_occupants (None = zjazd z sieci).
+        
+        Args:
+            road: Nowa droga pojazdu
+            distance: Dystans już przejechany po nowej drodze (w metrach)
+        """
+        vehicle = self.vehicle
+        if road is not None:
+            vehicle._inv_length = 1.0 / road.length if road.length > 0 else math.inf
+            vehicle.progress_on_road = distance * vehicle._inv_length if distance > 0 else 0.0
+        
+        occupants = self.road_occupants
+        if occupants is not None:
+            old_road = vehicle.current_road
+            if old_road is not None:
+                # Zjeżdżający pojazd wjechał zwykle najwcześniej (początek listy)
+                on_road = occupants.get(old_road.id)
+                if on_road:
+                    for i, other in enumerate(on_road):
+                        if other is vehicle:
+                            del on_road[i]
+                            break
+            if road is not None:
+                occupants.setdefault(road.id, []).append(vehicle)
+        
+        vehicle.current_road = road
+    
     def update(self, delta_time: float):
         """
         Aktualizuje pozycję pojazdu.
@@ -202,18 +308,15 @@ class VehicleController:
             # Stary system
             has_red_light = next_intersection.traffic_light.is_red_for_direction(current_intersection.id)
         
-        # Oblicz, jaką odległość pojazd pokonał
-        # speed jest w km/h, delta_time w sekundach
-        speed_m_s = self.vehicle.speed * 1000 / 3600  # konwersja km/h na m/s
-        distance_traveled = speed_m_s * delta_time
-        road_length = self.vehicle.current_road.length
-        
         # Sprawdź czy jest pojazd przed nami na tej samej drodze
         min_safe_distance = 0.03  # 3% długości drogi jako minimalna bezpieczna odległość
         vehicle_ahead_progress = self._check_vehicle_ahead()
         
-        # Aktualizuj postęp
-        proposed_progress = self.vehicle.progress_on_road + distance_traveled / road_length
+        # Aktualizuj postęp (odwrotność długości drogi jest buforowana
+        # przy wjeździe na drogę)
+        vehicle = self.vehicle
+        proposed_progress = (vehicle.progress_on_road
+                             + vehicle.speed * _KMH_TO_MPS * delta_time * vehicle._inv_length)
         
         # Sprawdź kolizję z pojazdem przed nami
         if vehicle_ahead_progress is not None:
@@ -225,15 +328,20 @@ class VehicleController:
             max_red_light_progress = 0.95
             proposed_progress = min(proposed_progress, max_red_light_progress)
         
-        self.vehicle.progress_on_road = proposed_progress
+        vehicle.progress_on_road = proposed_progress
         
         # Sprawdzenie czy pojazd dotarł do następnego skrzyżowania
-        # Może być konieczne przesunięcie się o kilka wierzchołków w jednym frame
-        while self.vehicle.progress_on_road >= 1.0:
-            self._move_to_next_intersection()
-            # Jeśli dotarł do celu, przerwij pętlę
-            if self.vehicle.state == VehicleState.ARRIVED:
-                break
+        # Może być konieczne przesunięcie się o kilka wierzchołków w jednym frame;
+        # nadmiar jest przenoszony w metrach, bo kolejne drogi mają różne długości
+        if proposed_progress >= 1.0:
+            carry = (proposed_progress - 1.0) * vehicle.current_road.length
+            while True:
+                self._move_to_next_intersection(carry)
+                road = vehicle.current_road
+                # Dotarł do celu, brak drogi lub nadmiar mieści się na nowej drodze
+                if vehicle.state == VehicleState.ARRIVED or road is None or carry < road.length:
+                    break
+                carry -= road.length
     
     def _check_vehicle_ahead(self) -> Optional[float]:
         """
@@ -245,6 +353,9 @@ class VehicleController:
         if not self.vehicle.current_road:
             return None
         
+        if self.road_occupants is not None:
+            return self._check_vehicle_ahead_on_road()
+        
         min_progress_ahead = None
         
         for other in self.other_vehicles:
@@ -262,8 +373,35 @@ class VehicleController:
         
         return min_progress_ahead
     
-    def _move_to_next_intersection(self):
-        """Przenosi pojazd na następne skrzyżowanie w ścieżce."""
+    def _check_vehicle_ahead_on_road(self) -> Optional[float]:
+        """
+        Szuka pojazdu przed nami wśród pojazdów na tej samej drodze.
+        Przeglądana jest tylko lista pojazdów bieżącej drogi (zwykle kilka
+        pojazdów), a nie cała flota.
+        
+        Returns:
+            Progress pojazdu przed nami lub None jeśli nie ma pojazdu
+        """
+        on_road = self.road_occupants.get(self.vehicle.current_road.id)
+        if not on_road:
+            return None
+        
+        progress = self.vehicle.progress_on_road
+        min_progress_ahead = None
+        for other in on_road:
+            other_progress = other.progress_on_road
+            if other_progress > progress and (min_progress_ahead is None or other_progress < min_progress_ahead):
+                min_progress_ahead = other_progress
+        
+        return min_progress_ahead
+    
+    def _move_to_next_intersection(self, carry: float = 0.0):
+        """
+        Przenosi pojazd na następne skrzyżowanie w ścieżce.
+        
+        Args:
+            carry: Dystans (w metrach) przejechany za skrzyżowaniem w tym kroku
+        """
         # Zapamiętaj poprzedni wierzchołek (skąd wjeżdżamy)
         prev_index = self.vehicle.current_path_index
         prev_intersection = self.vehicle.path[prev_index]
@@ -272,40 +410,28 @@ class VehicleController:
         self.vehicle.current_path_index += 1
         self.vehicle.current_intersection = self.vehicle.path[self.vehicle.current_path_index]
         
-        # Przyszły postęp (jeśli pojazd jechał szybciej niż długość drogi)
-        excess_progress = self.vehicle.progress_on_road - 1.0
-        self.vehicle.progress_on_road = excess_progress
-        
         # Zarejestruj przejazd przez bieżące skrzyżowanie w monitorze
-        if self.monitor:
-            # Następny wierzchołek (dokąd wyjedziemy), jeśli istnieje
-            next_id_opt: Optional[int] = None
-            if self.vehicle.current_path_index < len(self.vehicle.path) - 1:
-                next_id_opt = self.vehicle.path[self.vehicle.current_path_index + 1].id
-            self.monitor.record_pass(
-                intersection_id=self.vehicle.current_intersection.id,
-                from_id=prev_intersection.id,
-                to_id=next_id_opt
-            )
+        # Następny wierzchołek (dokąd wyjedziemy), jeśli istnieje
+        next_id_opt: Optional[int] = None
+        if self.vehicle.current_path_index < len(self.vehicle.path) - 1:
+            next_id_opt = self.vehicle.path[self.vehicle.current_path_index + 1].id
+        self.monitor.record_pass(
+            intersection_id=self.vehicle.current_intersection.id,
+            from_id=prev_intersection.id,
+            to_id=next_id_opt
+        )
 
         # Sprawdź czy dotarł do celu
         if self.vehicle.current_path_index >= len(self.vehicle.path) - 1:
             # Dotarł do celu
             self.vehicle.state = VehicleState.ARRIVED
             self.vehicle.progress_on_road = 0.0
-            self.vehicle.current_road = None
+            self._enter_road(None)
             return
         
         # Ustaw następną drogę (jeśli istnieje)
         next_intersection = self.vehicle.path[self.vehicle.current_path_index + 1]
-        road = self.network.get_road_between(
-            self.vehicle.current_intersection.id,
-            next_intersection.id
-        )
-        self.vehicle.current_road = road
-        next_intersection = self.vehicle.path[self.vehicle.current_path_index + 1]
-        road = self.network.get_road_between(
-            self.vehicle.current_intersection.id,
-            next_intersection.id
-        )
-        self.vehicle.current_road = road
+        # Brak drogi (None) zatrzymuje pojazd tak jak dotąd
+        road = self.vehicle.current_intersection.outgoing_by_target.get(next_intersection.id)
+        # Postęp na nowej drodze wynika z przeniesionego dystansu
+        self._enter_road(road, carry)
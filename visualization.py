@@ -4,9 +4,24 @@ Moduł do wizualizacji sieci drogowej za pomocą pygame.
 
 import pygame
 import math
-from typing import Tuple, List, Optional
+from dataclasses import dataclass
+from typing import Dict, Tuple, List, Optional
 from graph import RoadNetwork, Intersection, Road
-from vehicle import Vehicle, VehicleController
+from vehicle import VehicleController
+
+
+@dataclass(slots=True)
+class RoadGeometry:
+    """Geometria drogi na ekranie, liczona raz dla danej skali widoku.
+    segment: Odcinek drogi (x1, y1, x2, y2), przesunięty dla dróg dwukierunkowych
+    arrow: Wierzchołki strzałki kierunkowej (None dla zbyt krótkiej drogi)
+    angle_bin: Przedział kąta kierunku drogi (dla obróconych sprite'ów pojazdów)
+    lane_offset: Przesunięcie pojazdów na pas drogi w pikselach (0, 0 dla jednokierunkowej)
+    """
+    segment: Tuple[float, float, float, float]
+    arrow: Optional[List[Tuple[float, float]]]
+    angle_bin: int
+    lane_offset: Tuple[float, float]
 
 
 class RoadNetworkVisualizer:
@@ -24,11 +39,47 @@ class RoadNetworkVisualizer:
     COLOR_TRAFFIC_LIGHT_GREEN = (0, 255, 0)
     COLOR_TRAFFIC_LIGHT_RED = (255, 0, 0)
     COLOR_TRAFFIC_LIGHT_BORDER = (50, 50, 50)
+    # Kolor przezroczysty (colorkey) nieprzezroczystych sprite'ów
+    COLOR_KEY = (255, 0, 255)
     
     # Wymiary
     INTERSECTION_RADIUS = 12
     ARROW_SIZE = 20
+    # Kąt boków strzałki (30 stopni) jako stałe obrotu
+    ARROW_COS = math.cos(math.pi / 6)
+    ARROW_SIN = math.sin(math.pi / 6)
     ROAD_WIDTH = 8
+    # Bok komórki siatki najechania; nie mniejszy niż promień wykrywania,
+    # więc wystarczy przeszukać komórkę kursora i jej 8 sąsiadów
+    HOVER_GRID_CELL = 2 * INTERSECTION_RADIUS + 10
+    # Kwadrat promienia wykrywania najechania (porównania bez pierwiastka)
+    HOVER_DISTANCE_SQ = (INTERSECTION_RADIUS + 5) ** 2
+    VEHICLE_WIDTH = 8
+    VEHICLE_HEIGHT = 5
+    # Krok kwantyzacji kąta obrotu pojazdu (stopnie) - 90 gotowych sprite'ów
+    VEHICLE_ANGLE_STEP = 4
+    # Margines (px) poza ekranem, w którym pojazd jest jeszcze rysowany
+    VEHICLE_CULL_MARGIN = 16
+    # Stałe linie panelu informacyjnego (rysowane raz w statycznym tle)
+    HELP_LINES = (
+        "",
+        "Sterowanie:",
+        "ESC - zamknij",
+        "Kliknij skrzyżowanie - wybierz",
+        "T - pokaż/ukryj kontrolę świateł",
+        "[1-9] - wybierz fazę",
+        "+ / - - zmień czas fazy (±1s)",
+        "SHIFT + / - - zmień o ±5s",
+        "[ / ] - zmień częstotliwość spawnu",
+    )
+    # Maksymalna liczba napisów w pamięci podręcznej _render_text
+    TEXT_CACHE_LIMIT = 512
+    # Próg łącznego pola zmienionych obszarów (ułamek okna), powyżej którego
+    # tańsze jest odświeżenie całego ekranu przez flip()
+    DIRTY_AREA_LIMIT = 0.4
+    # Maksymalna liczba prostokątów dla display.update; przy większej
+    # liczbie narzut na prostokąt przewyższa zysk i używany jest flip()
+    DIRTY_RECT_LIMIT = 50
     
     def __init__(self, 
                  width: int = 1200,
@@ -68,6 +119,51 @@ class RoadNetworkVisualizer:
         # Kontrola spawnera
         self.show_spawn_controls: bool = False
         
+        # Elementy sieci pobrane raz przy wczytaniu i wersja topologii, z której pochodzą
+        self._intersections: Tuple[Intersection, ...] = ()
+        self._roads: Tuple[Road, ...] = ()
+        self._topology_version = -1
+        
+        # Geometria sieci na ekranie (patrz _rebuild_screen_cache)
+        self._intersection_screen: Dict[int, Tuple[int, int]] = {}
+        # road_id -> geometria drogi
+        self._road_geometry: Dict[int, RoadGeometry] = {}
+        # Siatka do wykrywania najechania: (kolumna, wiersz) -> ID skrzyżowań
+        self._hover_grid: Dict[Tuple[int, int], List[int]] = {}
+        # Skrzyżowania z sygnalizacją i ich pozycje: (x, y, sygnalizacja[, skrzyżowanie]);
+        # odświeżane przy zmianie network.attributes_version (patrz _rebuild_signal_lists)
+        self._screen_lights: List[Tuple] = []
+        self._screen_controllers: List[Tuple] = []
+        self._attributes_version = -1
+        # Wstępnie wyrenderowane skrzyżowania: id -> (zwykły, podświetlony)
+        self._intersection_sprites: Dict[int, Tuple[pygame.Surface, pygame.Surface]] = {}
+        
+        # Pojazd: bazowy sprite obrócony z góry dla każdego przedziału kąta
+        # (indeks listy = przedział), bez obracania w trakcie rysowania
+        vehicle_sprite = self._new_sprite((self.VEHICLE_WIDTH, self.VEHICLE_HEIGHT))
+        pygame.draw.ellipse(vehicle_sprite, self.COLOR_VEHICLE, vehicle_sprite.get_rect())
+        self._vehicle_sprites: List[pygame.Surface] = [
+            pygame.transform.rotate(vehicle_sprite, -angle_bin * self.VEHICLE_ANGLE_STEP)
+            for angle_bin in range(360 // self.VEHICLE_ANGLE_STEP)
+        ]
+        
+        # Wyrenderowane napisy i złożony panel informacyjny
+        self._text_cache: Dict[Tuple[str, pygame.font.Font, Tuple[int, int, int]], pygame.Surface] = {}
+        self._stats_key: Optional[tuple] = None
+        self._stats_surface: Optional[pygame.Surface] = None
+        self._spawners_key: Optional[tuple] = None
+        self._spawners_surface: Optional[pygame.Surface] = None
+        
+        # Spawnery floty pogrupowane według skrzyżowania (patrz spawners_version)
+        self._spawners_by_intersection: Dict[int, List] = {}
+        self._spawners_version = -1
+        
+        # Statyczne tło z siecią oraz obszary ekranu zmienione w klatce
+        self._static_bg: Optional[pygame.Surface] = None
+        self._dirty_rects: List[pygame.Rect] = []
+        self._previous_dirty_rects: List[pygame.Rect] = []
+        self._full_redraw = True
+        
 
     def load_network(self, network: RoadNetwork, auto_scale: bool = True):
         """
@@ -78,21 +174,36 @@ class RoadNetworkVisualizer:
             auto_scale: Czy automatycznie skalować siatkę
         """
         self.network = network
+        self._intersections = tuple(network.get_all_intersections())
+        self._roads = tuple(network.get_all_roads())
+        self._topology_version = network.topology_version
+        self._build_intersection_sprites()
         if auto_scale and network.num_intersections() > 0:
             self._calculate_scale()
+        else:
+            self._refresh_view()
     
     def _calculate_scale(self):
         """Automatycznie oblicza skalę do wyświetlenia całej sieci."""
         if not self.network or self.network.num_intersections() == 0:
             return
         
-        intersections = self.network.get_all_intersections()
-        
-        # Znajdź granice sieci
-        min_x = min(i.x for i in intersections)
-        max_x = max(i.x for i in intersections)
-        min_y = min(i.y for i in intersections)
-        max_y = max(i.y for i in intersections)
+        intersections = self._intersections
+        
+        # Znajdź granice sieci (jedno przejście po skrzyżowaniach)
+        min_x = max_x = intersections[0].x
+        min_y = max_y = intersections[0].y
+        for intersection in intersections:
+            x = intersection.x
+            y = intersection.y
+            if x < min_x:
+                min_x = x
+            elif x > max_x:
+                max_x = x
+            if y < min_y:
+                min_y = y
+            elif y > max_y:
+                max_y = y
         
         # Oblicz skalę aby zmieścić sieć w oknie
         width_available = self.width - 2 * self.offset_x
@@ -114,6 +225,167 @@ class RoadNetworkVisualizer:
         # Wycentruj sieć
         self.offset_x = self.offset_x + (width_available - network_width * self.scale) / 2
         self.offset_y = self.offset_y + (height_available - network_height * self.scale) / 2
+        
+        # Geometria ekranowa zależy od skali i przesunięcia
+        self._refresh_view()
+    
+    def _refresh_view(self):
+        """Przelicza bufory zależne od skali i przesunięcia widoku (geometria, siatka, tło)."""
+        self._rebuild_screen_cache()
+        self._build_static_background()
+    
+    def _rebuild_screen_cache(self):
+        """
+        Przelicza statyczną geometrię sieci we współrzędnych ekranu.
+        
+        Skrzyżowania i drogi nie zmieniają położenia, więc ich pozycje
+        i odcinki dróg (z przesunięciem dla dróg dwukierunkowych) liczone
+        są raz po wczytaniu sieci lub zmianie skali, a nie w każdej klatce.
+        """
+        self._intersection_screen = {}
+        self._road_geometry = {}
+        self._hover_grid = {}
+        if not self.network:
+            self._rebuild_signal_lists()
+            return
+        
+        cell = self.HOVER_GRID_CELL
+        for intersection in self._intersections:
+            x, y = self._world_to_screen(intersection.x, intersection.y)
+            self._intersection_screen[intersection.id] = (x, y)
+            self._hover_grid.setdefault((x // cell, y // cell), []).append(intersection.id)
+        self._rebuild_signal_lists()
+        
+        roads = self._roads
+        # Pary (from_id, to_id) wszystkich dróg - droga jest dwukierunkowa,
+        # gdy w zbiorze jest para odwrotna (jedno przejście zamiast wyszukiwania)
+        directed = {(road.from_intersection.id, road.to_intersection.id) for road in roads}
+        for road in roads:
+            has_reverse = (road.to_intersection.id, road.from_intersection.id) in directed
+            segment = self._road_segment(road, has_reverse)
+            self._road_geometry[road.id] = RoadGeometry(
+                segment=segment,
+                arrow=self._arrow_polygon(*segment),
+                angle_bin=self._angle_bin(road.dx, road.dy),
+                lane_offset=self._lane_offset(road, has_reverse)
+            )
+    
+    def _rebuild_signal_lists(self):
+        """
+        Zbiera skrzyżowania z sygnalizacją wraz z pozycjami na ekranie.
+        
+        Sygnalizacje rysowane co klatkę trafiają do osobnych list bez warunków
+        w pętli. Listy są przeliczane przy zmianie skali oraz gdy sieć zgłosi
+        zmianę atrybutów skrzyżowań (attributes_version).
+        """
+        self._screen_lights = []
+        self._screen_controllers = []
+        if not self.network:
+            self._attributes_version = -1
+            return
+        
+        self._attributes_version = self.network.attributes_version
+        screen = self._intersection_screen
+        for intersection in self._intersections:
+            if intersection.traffic_light:
+                x, y = screen[intersection.id]
+                self._screen_lights.append((x, y, intersection.traffic_light))
+            elif intersection.traffic_light_controller:
+                x, y = screen[intersection.id]
+                self._screen_controllers.append(
+                    (x, y, intersection.traffic_light_controller, intersection))
+    
+    def _new_sprite(self, size: Tuple[int, int]) -> pygame.Surface:
+        """
+        Tworzy pustą powierzchnię sprite'a z przezroczystością przez colorkey.
+        
+        Sprite'y są jednolite (bez półprzezroczystych pikseli), więc zamiast
+        kanału alfa wystarcza colorkey, a powierzchnia w formacie ekranu
+        (convert) kopiowana jest szybszą ścieżką niż blending per piksel.
+        """
+        sprite = pygame.Surface(size).convert()
+        sprite.fill(self.COLOR_KEY)
+        sprite.set_colorkey(self.COLOR_KEY)
+        return sprite
+    
+    def _angle_bin(self, dx: float, dy: float) -> int:
+        """Zwraca numer przedziału (co VEHICLE_ANGLE_STEP stopni) kąta wektora (dx, dy)."""
+        bins = 360 // self.VEHICLE_ANGLE_STEP
+        return round(math.degrees(math.atan2(dy, dx)) / self.VEHICLE_ANGLE_STEP) % bins
+    
+    def _build_intersection_sprites(self):
+        """
+        Renderuje raz koło, obramowanie i ID każdego skrzyżowania.
+        
+        Wygląd skrzyżowania zależy tylko od ID i stanu podświetlenia,
+        więc w każdej klatce wystarczy skopiować gotową powierzchnię.
+        """
+        self._intersection_sprites = {}
+        if not self.network:
+            return
+        
+        for intersection in self._intersections:
+            self._intersection_sprites[intersection.id] = (
+                self._render_intersection_sprite(intersection, self.COLOR_INTERSECTION),
+                self._render_intersection_sprite(intersection, self.COLOR_INTERSECTION_HOVER)
+            )
+    
+    def _render_intersection_sprite(self, intersection: Intersection,
+                                    color: Tuple[int, int, int]) -> pygame.Surface:
+        """Rysuje skrzyżowanie na osobnej powierzchni o środku w (R + 2, R + 2)."""
+        radius = self.INTERSECTION_RADIUS
+        size = 2 * radius + 4
+        center = (radius + 2, radius + 2)
+        sprite = self._new_sprite((size, size))
+        
+        pygame.draw.circle(sprite, color, center, radius)
+        pygame.draw.circle(sprite, self.COLOR_TEXT, center, radius, 2)
+        
+        text = self.font_small.render(str(intersection.id), True, self.COLOR_TEXT)
+        sprite.blit(text, text.get_rect(center=center))
+        return sprite
+    
+    def _build_static_background(self):
+        """
+        Rysuje raz tło okna z drogami, strzałkami, skrzyżowaniami i pomocą.
+        
+        Każda klatka zaczyna się od skopiowania tej powierzchni na ekran,
+        a po zmianie tła wymuszane jest pełne odświeżenie okna.
+        """
+        self._static_bg = pygame.Surface((self.width, self.height)).convert()
+        self._static_bg.fill(self.COLOR_BACKGROUND)
+        if self.network:
+            self._draw_roads(self._static_bg)
+            self._draw_intersection_sprites(self._static_bg)
+            self._draw_help(self._static_bg)
+        self._full_redraw = True
+    
+    def _mark_dirty(self, rect: pygame.Rect):
+        """Zapamiętuje obszar ekranu zmieniony w bieżącej klatce."""
+        self._dirty_rects.append(rect)
+    
+    def _present_frame(self):
+        """
+        Przekazuje klatkę na ekran.
+        
+        Odświeżane są obszary zmienione w tej i poprzedniej klatce (aby
+        zamazać elementy, które się przesunęły lub zniknęły). Gdy ich łączne
+        pole przekracza DIRTY_AREA_LIMIT okna lub jest ich więcej niż
+        DIRTY_RECT_LIMIT, wiele małych prostokątów jest wolniejsze od
+        jednego flip(), więc odświeżany jest cały ekran.
+        """
+        rects = self._dirty_rects + self._previous_dirty_rects
+        if (self._full_redraw
+                or len(rects) > self.DIRTY_RECT_LIMIT
+                or sum(rect.width * rect.height for rect in rects)
+                > self.DIRTY_AREA_LIMIT * self.width * self.height):
+            pygame.display.flip()
+            self._full_redraw = False
+        else:
+            pygame.display.update(rects)
+        
+        self._previous_dirty_rects = self._dirty_rects
+        self._dirty_rects = []
     
     def _world_to_screen(self, x: float, y: float) -> Tuple[int, int]:
         """Konwertuje współrzędne świata na ekran."""
@@ -130,22 +402,23 @@ class RoadNetworkVisualizer:
     def set_fleet(self, fleet):
         """Ustawia flotę pojazdów do wizualizacji."""
         self.fleet = fleet
+        self._spawners_version = -1
     
     def update_vehicles(self, delta_time: float):
         """Aktualizuje flotę pojazdów."""
         if self.fleet:
             self.fleet.update(delta_time)
     
-    def _draw_road(self, road: Road):
-        """Rysuje drogę z strzałką kierunkową."""
-        x1, y1 = self._world_to_screen(road.from_intersection.x, road.from_intersection.y)
-        x2, y2 = self._world_to_screen(road.to_intersection.x, road.to_intersection.y)
+    def _road_segment(self, road: Road, has_reverse: bool) -> Tuple[float, float, float, float]:
+        """
+        Zwraca odcinek drogi na ekranie (x1, y1, x2, y2).
         
-        # Sprawdź czy istnieje droga w przeciwnym kierunku (dwukierunkowa)
-        has_reverse = False
-        if self.network:
-            reverse_road = self.network.get_road_between(road.to_intersection.id, road.from_intersection.id)
-            has_reverse = reverse_road is not None
+        Args:
+            road: Droga
+            has_reverse: Czy istnieje droga w przeciwnym kierunku (dwukierunkowa)
+        """
+        x1, y1 = self._intersection_screen[road.from_intersection.id]
+        x2, y2 = self._intersection_screen[road.to_intersection.id]
         
         # Jeśli droga jest dwukierunkowa, przesuń ją o połowę szerokości na bok
         if has_reverse:
@@ -171,14 +444,34 @@ class RoadNetworkVisualizer:
                 x2 += perp_dx * offset
                 y2 += perp_dy * offset
         
-        # Rysuj główną linię drogi
-        pygame.draw.line(self.screen, self.COLOR_ROAD, (x1, y1), (x2, y2), self.ROAD_WIDTH)
-        
-        # Rysuj strzałkę kierunkową
-        self._draw_arrow(x1, y1, x2, y2)
+        return x1, y1, x2, y2
+    
+    def _draw_roads(self, screen: pygame.Surface):
+        """Rysuje wszystkie drogi ze strzałkami kierunkowymi (z bufora odcinków)."""
+        color = self.COLOR_ROAD
+        width = self.ROAD_WIDTH
+        draw_line = pygame.draw.line
+        
+        # Najpierw wszystkie linie, potem strzałki - strzałki zawsze na wierzchu
+        geometry = self._road_geometry.values()
+        for road in geometry:
+            x1, y1, x2, y2 = road.segment
+            draw_line(screen, color, (x1, y1), (x2, y2), width)
+        
+        draw_polygon = pygame.draw.polygon
+        arrow_color = self.COLOR_ARROW
+        for road in geometry:
+            if road.arrow is not None:
+                draw_polygon(screen, arrow_color, road.arrow)
     
-    def _draw_arrow(self, x1: int, y1: int, x2: int, y2: int):
-        """Rysuje strzałkę wskazującą kierunek drogi."""
+    def _arrow_polygon(self, x1: float, y1: float, x2: float, y2: float
+                       ) -> Optional[List[Tuple[float, float]]]:
+        """
+        Oblicza trójkąt strzałki wskazującej kierunek drogi.
+        
+        Returns:
+            Wierzchołki strzałki lub None dla zbyt krótkiego odcinka
+        """
         # Punkt środkowy drogi
         mid_x = (x1 + x2) // 2
         mid_y = (y1 + y2) // 2
@@ -189,7 +482,7 @@ class RoadNetworkVisualizer:
         length = math.sqrt(dx**2 + dy**2)
         
         if length < 1:
-            return
+            return None
         
         # Znormalizuj wektor
         dx /= length
@@ -197,49 +490,46 @@ class RoadNetworkVisualizer:
         
         # Punkty strzałki
         arrow_size = self.ARROW_SIZE
-        arrow_angle = math.pi / 6  # 30 stopni
+        cos_a = self.ARROW_COS
+        sin_a = self.ARROW_SIN
         
         # Koniec strzałki
         end_x = mid_x + dx * arrow_size
         end_y = mid_y + dy * arrow_size
         
-        # Boki strzałki
-        side_angle = math.atan2(dy, dx)
-        left_x = end_x - arrow_size * math.cos(side_angle + arrow_angle)
-        left_y = end_y - arrow_size * math.sin(side_angle + arrow_angle)
+        # Boki strzałki - wektor kierunku obrócony o ±30 stopni
+        # (dx, dy) = (cos, sin) kąta drogi, więc atan2/cos/sin są zbędne
+        left_x = end_x - arrow_size * (dx * cos_a - dy * sin_a)
+        left_y = end_y - arrow_size * (dy * cos_a + dx * sin_a)
         
-        right_x = end_x - arrow_size * math.cos(side_angle - arrow_angle)
-        right_y = end_y - arrow_size * math.sin(side_angle - arrow_angle)
+        right_x = end_x - arrow_size * (dx * cos_a + dy * sin_a)
+        right_y = end_y - arrow_size * (dy * cos_a - dx * sin_a)
         
-        # Rysuj strzałkę
-        pygame.draw.polygon(self.screen, self.COLOR_ARROW, 
-                           [(end_x, end_y), (left_x, left_y), (right_x, right_y)])
+        return [(end_x, end_y), (left_x, left_y), (right_x, right_y)]
     
-    def _draw_intersection(self, intersection: Intersection):
-        """Rysuje skrzyżowanie."""
-        x, y = self._world_to_screen(intersection.x, intersection.y)
-        
-        # Wybierz kolor w zależności od stanu (hover)
-        color = (self.COLOR_INTERSECTION_HOVER 
-                 if self.hovered_intersection == intersection.id 
-                 else self.COLOR_INTERSECTION)
-        
-        # Rysuj koło
-        pygame.draw.circle(self.screen, color, (x, y), self.INTERSECTION_RADIUS)
-        pygame.draw.circle(self.screen, self.COLOR_TEXT, (x, y), self.INTERSECTION_RADIUS, 2)
-        
-        # Rysuj ID skrzyżowania
-        text = self.font_small.render(str(intersection.id), True, self.COLOR_TEXT)
-        text_rect = text.get_rect(center=(x, y))
-        self.screen.blit(text, text_rect)
-        
-        # Rysuj sygnalizację świetlną jeśli istnieje
-        if intersection.traffic_light:
-            self._draw_traffic_light(x, y, intersection.traffic_light)
-        elif intersection.traffic_light_controller:
-            self._draw_traffic_light_controller(x, y, intersection.traffic_light_controller, intersection)
-        
-        # Monitor przepustowości
+    def _draw_intersection_sprites(self, screen: pygame.Surface):
+        """Rysuje wszystkie skrzyżowania (bez podświetlenia) jednym wywołaniem blits."""
+        sprites = self._intersection_sprites
+        shift = self.INTERSECTION_RADIUS + 2
+        screen.blits([(sprites[intersection_id][0], (x - shift, y - shift))
+                      for intersection_id, (x, y) in self._intersection_screen.items()],
+                     doreturn=False)
+    
+    def _draw_intersections(self):
+        """Rysuje podświetlone skrzyżowanie oraz sygnalizację świetlną."""
+        # Pozostałe skrzyżowania są częścią statycznego tła
+        hovered = self.hovered_intersection
+        if hovered is not None and hovered in self._intersection_screen:
+            shift = self.INTERSECTION_RADIUS + 2
+            x, y = self._intersection_screen[hovered]
+            self._mark_dirty(self.screen.blit(self._intersection_sprites[hovered][1],
+                                              (x - shift, y - shift)))
+        
+        # Rysuj sygnalizację świetlną (zmienia się w czasie, więc co klatkę)
+        for x, y, traffic_light in self._screen_lights:
+            self._draw_traffic_light(x, y, traffic_light)
+        for x, y, controller, intersection in self._screen_controllers:
+            self._draw_traffic_light_controller(x, y, controller, intersection)
 
     def _draw_throughput_overlay(self, x: int, y: int, intersection_id: int):
         """Rysuje panel z przepustowością (pojazdy/min) dla danego skrzyżowania."""
@@ -268,12 +558,13 @@ class RoadNetworkVisualizer:
         box_y = y - height // 2
 
         # Tło i obramowanie
-        pygame.draw.rect(self.screen, (250, 250, 250), (box_x, box_y, width, height), border_radius=6)
+        self._mark_dirty(pygame.draw.rect(self.screen, (250, 250, 250), (box_x, box_y, width, height),
+                                          border_radius=6))
         pygame.draw.rect(self.screen, self.COLOR_TEXT, (box_x, box_y, width, height), width=1, border_radius=6)
 
         # Renderowanie linii
         for i, line in enumerate(lines):
-            txt = self.font_small.render(line, True, self.COLOR_TEXT)
+            txt = self._render_text(line, self.font_small, self.COLOR_TEXT)
             self.screen.blit(txt, (box_x + padding, box_y + padding + i * line_h))
     
     def _draw_traffic_light(self, x: int, y: int, traffic_light):
@@ -284,8 +575,8 @@ class RoadNetworkVisualizer:
         light_radius = 8
         
         # Rysuj obramowanie
-        pygame.draw.rect(self.screen, self.COLOR_TRAFFIC_LIGHT_BORDER,
-                        (light_x - 12, light_y - 25, 24, 50), border_radius=5)
+        self._mark_dirty(pygame.draw.rect(self.screen, self.COLOR_TRAFFIC_LIGHT_BORDER,
+                                          (light_x - 12, light_y - 25, 24, 50), border_radius=5))
         pygame.draw.rect(self.screen, (200, 200, 200),
                         (light_x - 11, light_y - 24, 22, 48), border_radius=5)
         
@@ -312,17 +603,18 @@ class RoadNetworkVisualizer:
         # Rysuj tło dla tekstu
         bg_width = 40
         bg_height = 20
-        pygame.draw.rect(self.screen, self.COLOR_TRAFFIC_LIGHT_GREEN,
-                        (label_x - bg_width//2, label_y - bg_height//2, bg_width, bg_height), 
-                        border_radius=3)
+        bg_rect = pygame.draw.rect(self.screen, self.COLOR_TRAFFIC_LIGHT_GREEN,
+                                   (label_x - bg_width//2, label_y - bg_height//2, bg_width, bg_height), 
+                                   border_radius=3)
         pygame.draw.rect(self.screen, self.COLOR_TRAFFIC_LIGHT_BORDER,
                         (label_x - bg_width//2, label_y - bg_height//2, bg_width, bg_height), 
                         width=2, border_radius=3)
         
         # Rysuj tekst z dozwolonymi kierunkami
-        text = self.font_small.render(allowed_text, True, (0, 0, 0))
+        text = self._render_text(allowed_text, self.font_small, (0, 0, 0))
         text_rect = text.get_rect(center=(label_x, label_y))
         self.screen.blit(text, text_rect)
+        self._mark_dirty(bg_rect.union(text_rect))
     
     def _render_throughput_overlay(self):
         """Rysuje overlay przepustowości po wszystkich elementach, aby był na wierzchu."""
@@ -331,75 +623,72 @@ class RoadNetworkVisualizer:
         intersection = self.network.get_intersection(self.hovered_intersection)
         if not intersection:
             return
-        x, y = self._world_to_screen(intersection.x, intersection.y)
+        x, y = self._intersection_screen[intersection.id]
         self._draw_throughput_overlay(x, y, intersection.id)
     
-    def _draw_vehicle(self, vehicle: Vehicle):
-        """Rysuje samochód na ekranie."""
-        vx, vy = vehicle.get_current_position()
-        
-        # Oblicz przesunięcie dla drogi dwukierunkowej
-        offset_x, offset_y = 0, 0
-        if vehicle.current_road and self.network:
-            # Sprawdź czy droga jest dwukierunkowa
-            reverse_road = self.network.get_road_between(
-                vehicle.current_road.to_intersection.id,
-                vehicle.current_road.from_intersection.id
-            )
+    def _draw_vehicles(self):
+        """
+        Rysuje wszystkie pojazdy floty jednym wywołaniem blits.
+        
+        Pozycje całej floty (fleet.get_positions) rzutowane są na ekran
+        w jednej pętli z lokalnymi skalą i przesunięciem, bez wywołań
+        _world_to_screen na każdy pojazd. Pojazdy poza ekranem (z marginesem
+        VEHICLE_CULL_MARGIN) są pomijane.
+        """
+        scale = self.scale
+        origin_x = self.offset_x
+        origin_y = self.offset_y
+        road_geometry = self._road_geometry
+        sprites = self._vehicle_sprites
+        margin = self.VEHICLE_CULL_MARGIN
+        max_x = self.width + margin
+        max_y = self.height + margin
+        
+        blit_sequence = []
+        append = blit_sequence.append
+        for vehicle, (vx, vy) in zip(self.fleet.vehicles, self.fleet.get_positions()):
+            road = vehicle.current_road
+            if road is not None:
+                # Przesunięcie na pas drogi dwukierunkowej i kierunek drogi
+                geometry = road_geometry[road.id]
+                lane_x, lane_y = geometry.lane_offset
+                angle_bin = geometry.angle_bin
+            else:
+                lane_x = lane_y = 0.0
+                angle_bin = 0
             
-            if reverse_road is not None:
-                # Oblicz wektor prostopadły do drogi (w współrzędnych świata)
-                dx = (vehicle.current_road.to_intersection.x - 
-                      vehicle.current_road.from_intersection.x)
-                dy = (vehicle.current_road.to_intersection.y - 
-                      vehicle.current_road.from_intersection.y)
-                length = math.sqrt(dx**2 + dy**2)
-                
-                if length > 0:
-                    # Znormalizuj wektor
-                    dx /= length
-                    dy /= length
-                    
-                    # Wektor prostopadły (obrót o 90 stopni)
-                    perp_dx = -dy
-                    perp_dy = dx
-                    
-                    # Przesunięcie (połowa szerokości drogi)
-                    offset = self.ROAD_WIDTH / self.scale
-                    
-                    offset_x = perp_dx * offset
-                    offset_y = perp_dy * offset
-        
-        # Zastosuj przesunięcie do pozycji pojazdu
-        x, y = self._world_to_screen(vx + offset_x, vy + offset_y)
-        
-        # Rysuj pojazd jako prostokąt
-        vehicle_width = 8
-        vehicle_height = 5
-        
-        # Oblicz kąt, w którym jedzie pojazd
-        angle = 0
-        if vehicle.current_road:
-            dx = (vehicle.current_road.to_intersection.x - 
-                  vehicle.current_road.from_intersection.x)
-            dy = (vehicle.current_road.to_intersection.y - 
-                  vehicle.current_road.from_intersection.y)
-            angle = math.atan2(dy, dx)
-        
-        # Utwórz powierzchnię pojazdu i obróć ją
-        vehicle_surface = pygame.Surface((vehicle_width, vehicle_height), pygame.SRCALPHA)
-        pygame.draw.ellipse(vehicle_surface, (255, 50, 50), vehicle_surface.get_rect())
-        
-        # Obróć powierzchnię
-        rotated_surface = pygame.transform.rotate(vehicle_surface, -math.degrees(angle))
-        rotated_rect = rotated_surface.get_rect(center=(x, y))
-        
-        self.screen.blit(rotated_surface, rotated_rect)
-        
-        # Rysuj ID pojazdu
-        # text = self.font_small.render(f"V{vehicle.id}", True, self.COLOR_TEXT)
-        # text_rect = text.get_rect(center=(x, y - 15))
-        # self.screen.blit(text, text_rect)
+            x = int(origin_x + vx * scale + lane_x)
+            y = int(origin_y + vy * scale + lane_y)
+            if not (-margin <= x <= max_x and -margin <= y <= max_y):
+                continue
+            
+            sprite = sprites[angle_bin]
+            
+            # Rysuj ID pojazdu
+            # text = self.font_small.render(f"V{vehicle.id}", True, self.COLOR_TEXT)
+            # text_rect = text.get_rect(center=(x, y - 15))
+            # self.screen.blit(text, text_rect)
+            
+            append((sprite, sprite.get_rect(center=(x, y))))
+        
+        self.screen.blits(blit_sequence, doreturn=False)
+        for _, rect in blit_sequence:
+            self._mark_dirty(rect)
+    
+    def _lane_offset(self, road: Road, has_reverse: bool) -> Tuple[float, float]:
+        """
+        Zwraca przesunięcie pojazdu (w pikselach ekranu) na pas drogi.
+        
+        Dla drogi dwukierunkowej (has_reverse) pojazd jedzie przesunięty
+        o połowę szerokości drogi w bok, tak jak narysowana droga.
+        """
+        # Długość wektora przesunięcia podzielona przez długość drogi - jeden
+        # współczynnik zamiast normalizacji; 0 dla drogi jednokierunkowej
+        length = math.hypot(road.dx, road.dy)
+        factor = self.ROAD_WIDTH / length if has_reverse and length > 0 else 0.0
+        
+        # Wektor prostopadły (obrót (dx, dy) o 90 stopni: (-dy, dx))
+        return -road.dy * factor, road.dx * factor
     
     def _update_hover(self, mouse_x: int, mouse_y: int):
         """Aktualizuje informację o najechaniu myszką na skrzyżowanie."""
@@ -408,41 +697,66 @@ class RoadNetworkVisualizer:
         if not self.network:
             return
         
-        for intersection in self.network.get_all_intersections():
-            ix, iy = self._world_to_screen(intersection.x, intersection.y)
-            dist = ((ix - mouse_x)**2 + (iy - mouse_y)**2) ** 0.5
-            
-            if dist < self.INTERSECTION_RADIUS + 5:
-                self.hovered_intersection = intersection.id
-                break
+        # Sprawdź tylko skrzyżowania z sąsiednich komórek siatki (bez pierwiastka)
+        cell = self.HOVER_GRID_CELL
+        col, row = mouse_x // cell, mouse_y // cell
+        best_dist_sq = self.HOVER_DISTANCE_SQ
+        positions = self._intersection_screen
+        for c in (col - 1, col, col + 1):
+            for r in (row - 1, row, row + 1):
+                for intersection_id in self._hover_grid.get((c, r), ()):
+                    ix, iy = positions[intersection_id]
+                    dx = ix - mouse_x
+                    dy = iy - mouse_y
+                    dist_sq = dx * dx + dy * dy
+                    if dist_sq < best_dist_sq:
+                        best_dist_sq = dist_sq
+                        self.hovered_intersection = intersection_id
+    
+    def _render_text(self, text: str, font: pygame.font.Font,
+                     color: Tuple[int, int, int]) -> pygame.Surface:
+        """
+        Renderuje tekst z pamięcią podręczną - każdy napis renderowany jest raz.
+        
+        Args:
+            text: Treść napisu
+            font: Czcionka
+            color: Kolor tekstu
+        
+        Returns:
+            Powierzchnia z wyrenderowanym tekstem
+        """
+        key = (text, font, color)
+        surface = self._text_cache.get(key)
+        if surface is None:
+            if len(self._text_cache) >= self.TEXT_CACHE_LIMIT:
+                self._text_cache.clear()
+            surface = font.render(text, True, color)
+            self._text_cache[key] = surface
+        return surface
     
     def _draw_info_panel(self):
-        """Rysuje panel informacyjny."""
+        """
+        Rysuje panel informacyjny.
+        
+        Stała pomoc (HELP_LINES) jest częścią statycznego tła; tu rysowane
+        są tylko statystyki i spawnery, składane na nowo po zmianie danych.
+        """
         if not self.network:
             return
         
         num_vehicles = self.fleet.num_vehicles() if self.fleet else 0
         
-        info_lines = [
+        stats_lines = (
             f"Skrzyżowania: {self.network.num_intersections()}",
             f"Drogi: {self.network.num_roads()}",
             f"Pojazdy: {num_vehicles}",
-            "",
-            "Sterowanie:",
-            "ESC - zamknij",
-            "Kliknij skrzyżowanie - wybierz",
-            "T - pokaż/ukryj kontrolę świateł",
-            "[1-9] - wybierz fazę",
-            "+ / - - zmień czas fazy (±1s)",
-            "SHIFT + / - - zmień o ±5s",
-            "[ / ] - zmień częstotliwość spawnu"
-        ]
-        
-        y_offset = 10
-        for line in info_lines:
-            text = self.font_small.render(line, True, self.COLOR_TEXT)
-            self.screen.blit(text, (10, y_offset))
-            y_offset += 25
+        )
+        if stats_lines != self._stats_key:
+            self._stats_key = stats_lines
+            self._stats_surface = self._compose_lines(
+                [(line, self.font_small, i * 25) for i, line in enumerate(stats_lines)])
+        self._mark_dirty(self.screen.blit(self._stats_surface, (10, 10)))
         
         # Informacje o najechaniu
         if self.hovered_intersection is not None:
@@ -450,29 +764,51 @@ class RoadNetworkVisualizer:
             if intersection:
                 outgoing = self.network.get_outgoing_roads(intersection.id)
                 detail_text = f"{intersection.name} ({len(outgoing)} wychodzących dróg)"
-                text = self.font.render(detail_text, True, self.COLOR_INTERSECTION)
-                self.screen.blit(text, (10, self.height - 40))
-
-        # Informacje o spawnerach
+                text = self._render_text(detail_text, self.font, self.COLOR_INTERSECTION)
+                self._mark_dirty(self.screen.blit(text, (10, self.height - 40)))
+        
+        # Informacje o spawnerach (pod statystykami i pomocą)
         if self.selected_intersection is not None:
-            spawners = self._get_spawners_for_selected_intersection()
-            y_offset += 10
-            self.screen.blit(
-                self.font.render("Spawners:", True, self.COLOR_TEXT),
-                (10, y_offset)
-            )
-            y_offset += 20
-
-            for idx, spawner in enumerate(spawners):
-                text = (
-                    f"#{idx} "
-                    f"rate={spawner.spawn_rate:.2f} pojazdów/s"
-                )
-                self.screen.blit(
-                    self.font_small.render(text, True, self.COLOR_TEXT),
-                    (10, y_offset)
-                )
-                y_offset += 18
+            spawn_rates = tuple(spawner.spawn_rate
+                                for spawner in self._get_spawners_for_selected_intersection())
+            spawners_key = (self.selected_intersection, spawn_rates)
+            if spawners_key != self._spawners_key:
+                self._spawners_key = spawners_key
+                entries = [("Spawners:", self.font, 0)]
+                for idx, spawn_rate in enumerate(spawn_rates):
+                    text = (
+                        f"#{idx} "
+                        f"rate={spawn_rate:.2f} pojazdów/s"
+                    )
+                    entries.append((text, self.font_small, 20 + idx * 18))
+                self._spawners_surface = self._compose_lines(entries)
+            
+            y_offset = 10 + (len(stats_lines) + len(self.HELP_LINES)) * 25 + 10
+            self._mark_dirty(self.screen.blit(self._spawners_surface, (10, y_offset)))
+    
+    def _compose_lines(self, entries: List[Tuple[str, pygame.font.Font, int]]) -> pygame.Surface:
+        """
+        Składa linie tekstu w jedną przezroczystą powierzchnię.
+        
+        Args:
+            entries: Linie jako krotki (tekst, czcionka, y względem górnej krawędzi)
+        
+        Returns:
+            Powierzchnia z wyrenderowanymi liniami
+        """
+        rendered = [(self._render_text(text, font, self.COLOR_TEXT), y) for text, font, y in entries]
+        width = max(surface.get_width() for surface, _ in rendered)
+        height = max(y + surface.get_height() for surface, y in rendered)
+        panel = pygame.Surface((width, height), pygame.SRCALPHA)
+        panel.blits([(surface, (0, y)) for surface, y in rendered], doreturn=False)
+        return panel
+    
+    def _draw_help(self, screen: pygame.Surface):
+        """Rysuje stałą część panelu informacyjnego (pomoc) pod statystykami."""
+        y_offset = 10 + 3 * 25
+        for line in self.HELP_LINES:
+            screen.blit(self._render_text(line, self.font_small, self.COLOR_TEXT), (10, y_offset))
+            y_offset += 25
     
     def _draw_light_control_panel(self):
         """Rysuje panel kontroli świateł dla wybranego skrzyżowania."""
@@ -492,16 +828,16 @@ class RoadNetworkVisualizer:
         panel_height = 200
         
         # Tło panelu
-        pygame.draw.rect(self.screen, (240, 240, 220),
-                        (panel_x, panel_y, panel_width, panel_height),
-                        border_radius=10)
+        self._mark_dirty(pygame.draw.rect(self.screen, (240, 240, 220),
+                                          (panel_x, panel_y, panel_width, panel_height),
+                                          border_radius=10))
         pygame.draw.rect(self.screen, (100, 100, 100),
                         (panel_x, panel_y, panel_width, panel_height),
                         width=2, border_radius=10)
         
         # Nagłówek
         title = f"Kontrola: {intersection.name}"
-        text = self.font.render(title, True, (0, 0, 0))
+        text = self._render_text(title, self.font, (0, 0, 0))
         self.screen.blit(text, (panel_x + 10, panel_y + 10))
         
         # Informacje o fazach
@@ -518,19 +854,19 @@ class RoadNetworkVisualizer:
             
             marker = "→" if is_current else " "
             phase_text = f"{marker} [{i+1}] Faza {i}: {phase.duration:.1f}s"
-            text = self.font_small.render(phase_text, True, (0, 0, 0))
+            text = self._render_text(phase_text, self.font_small, (0, 0, 0))
             self.screen.blit(text, (panel_x + 10, y))
             
             y += 20
             dir_text = f"    Kierunki: {dirs}"
-            text = self.font_small.render(dir_text, True, (60, 60, 60))
+            text = self._render_text(dir_text, self.font_small, (60, 60, 60))
             self.screen.blit(text, (panel_x + 10, y))
             y += 25
         
         # Instrukcje
         y = panel_y + panel_height - 30
         instr_text = "Wybierz [1-9], +/- zmień czas"
-        text = self.font_small.render(instr_text, True, (100, 100, 100))
+        text = self._render_text(instr_text, self.font_small, (100, 100, 100))
         self.screen.blit(text, (panel_x + 10, y))
     
     def run(self):
@@ -538,9 +874,16 @@ class RoadNetworkVisualizer:
         running = True
         selected_phase = 0  # Aktualnie wybrana faza do edycji
         
+        # Do kolejki trafiają tylko obsługiwane zdarzenia
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed([pygame.QUIT, pygame.KEYDOWN, pygame.MOUSEMOTION,
+                                  pygame.MOUSEBUTTONDOWN, pygame.VIDEOEXPOSE])
+        
         while running:
             delta_time = self.clock.tick(60) / 1000.0  # Czas w sekundach
             
+            # Najechanie liczone tylko dla ostatniej pozycji myszy w klatce
+            last_motion = None
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
@@ -567,9 +910,16 @@ class RoadNetworkVisualizer:
 
                     elif event.key == pygame.K_RIGHTBRACKET:  # ]
                         self._adjust_selected_spawner_rate(0.1)
+                elif event.type == pygame.VIDEOEXPOSE:
+                    # Okno zostało odsłonięte - odśwież cały ekran
+                    self._full_redraw = True
                 elif event.type == pygame.MOUSEMOTION:
-                    self._update_hover(event.pos[0], event.pos[1])
+                    last_motion = event.pos
                 elif event.type == pygame.MOUSEBUTTONDOWN:
+                    # Kliknięcie dotyczy skrzyżowania pod kursorem w chwili kliknięcia
+                    if last_motion is not None:
+                        self._update_hover(last_motion[0], last_motion[1])
+                        last_motion = None
                     if event.button == 1:  # Lewy przycisk myszy
                         # Wybierz skrzyżowanie
                         if self.hovered_intersection is not None:
@@ -577,34 +927,37 @@ class RoadNetworkVisualizer:
                             self.show_light_controls = True
                             selected_phase = 0
             
+            if last_motion is not None:
+                self._update_hover(last_motion[0], last_motion[1])
+            
             # Aktualizuj pojazdy
             self.update_vehicles(delta_time)
             
             # Aktualizuj sygnalizacje świetlne
             if self.network:
-                for intersection in self.network.get_all_intersections():
-                    if intersection.traffic_light:
-                        intersection.traffic_light.update(delta_time)
-                    if intersection.traffic_light_controller:
-                        intersection.traffic_light_controller.update(delta_time)
+                self.network.update_traffic_lights(delta_time)
+            
+            # Sieć zmieniła się od wczytania - przelicz bufory bez zmiany skali
+            if self.network and self.network.topology_version != self._topology_version:
+                self.load_network(self.network, auto_scale=False)
+            elif self.network and self.network.attributes_version != self._attributes_version:
+                # Zmieniła się sygnalizacja lub cele - wystarczy odświeżyć listy świateł
+                self._rebuild_signal_lists()
             
-            # Rysuj tło
-            self.screen.fill(self.COLOR_BACKGROUND)
+            # Rysuj tło z siecią (statyczne, rysowane raz w load_network)
+            if self._static_bg is not None:
+                self.screen.blit(self._static_bg, (0, 0))
+            else:
+                self.screen.fill(self.COLOR_BACKGROUND)
             
             # Rysuj sieć
             if self.network:
-                # Rysuj drogi
-                for road in self.network.get_all_roads():
-                    self._draw_road(road)
-                
                 # Rysuj skrzyżowania
-                for intersection in self.network.get_all_intersections():
-                    self._draw_intersection(intersection)
+                self._draw_intersections()
                 
                 # Rysuj pojazdy z floty
                 if self.fleet:
-                    for vehicle in self.fleet.get_vehicles():
-                        self._draw_vehicle(vehicle)
+                    self._draw_vehicles()
             
             # Rysuj panel informacyjny
             self._draw_info_panel()
@@ -615,8 +968,8 @@ class RoadNetworkVisualizer:
             # Rysuj overlay przepustowości na końcu (nad wszystkimi elementami)
             self._render_throughput_overlay()
             
-            # Zaktualizuj ekran
-            pygame.display.flip()
+            # Zaktualizuj ekran (tylko zmienione obszary, jeśli jest ich niewiele)
+            self._present_frame()
         
         pygame.quit()
     
@@ -639,17 +992,17 @@ class RoadNetworkVisualizer:
         if not self.fleet or self.selected_intersection is None:
             return []
 
-        return [
-            spawner
-            for spawner in self.fleet.spawners
-            if spawner.spawn_intersection.id == self.selected_intersection
-        ]
+        # Grupowanie odświeżane tylko po zmianie listy spawnerów floty
+        if self._spawners_version != self.fleet.spawners_version:
+            self._spawners_version = self.fleet.spawners_version
+            self._spawners_by_intersection = {}
+            for spawner in self.fleet.spawners:
+                self._spawners_by_intersection.setdefault(
+                    spawner.spawn_intersection.id, []).append(spawner)
+
+        return self._spawners_by_intersection.get(self.selected_intersection, [])
 
     def _adjust_selected_spawner_rate(self, delta: float):
         """Zwiększa lub zmniejsza częstotliwość spawnu (λ) dla wybranego skrzyżowania."""
-        if not self.fleet or self.selected_intersection is None:
-            return
-
-        for spawner in self.fleet.spawners:
-            if spawner.spawn_intersection.id == self.selected_intersection:
-                spawner.spawn_rate = max(0.0, spawner.spawn_rate + delta)
\ No newline at end of file
+        for spawner in self._get_spawners_for_selected_intersection():
+            spawner.spawn_rate = max(0.0, spawner.spawn_rate + delta)
\ No newline at end of file